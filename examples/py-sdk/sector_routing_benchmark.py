@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import re
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'sdk-py'))
+
+from openmemory import OpenMemory, SECTOR_CONFIGS, SectorClassifier
+from openmemory.sectors import FLAGS
+
+SAMPLES = [
+    "I went to Paris yesterday and loved the Eiffel Tower",
+    "I feel really excited about the new AI project",
+    "My morning routine: coffee, then check emails, then code",
+    "Machine learning algorithms process large datasets efficiently",
+    "To install Python packages, use pip install package_name",
+    "What is the meaning of life and our purpose here?",
+    "Yesterday I met my old friend Sarah at the coffee shop",
+    "First backup your data, then format the hard drive",
+    "This presentation made me feel really confident and proud!!",
+    "I often wonder about the nature of consciousness and reality",
+    "Error E1042 when the sync job runs at 3:15 on Tuesday",
+    "I should have asked why the rollout happened in 2023",
+]
+
+
+def naive_scores(patterns, content):
+    """Straight per-pattern loop, as in the server's classifyContent."""
+    scores = dict.fromkeys(SECTOR_CONFIGS, 0)
+    for sector, pat, weight in patterns:
+        if pat.search(content):
+            scores[sector] += (pat.groups + 1) * weight
+    return scores
+
+
+def sector_routing_benchmark(server=None):
+    print('🧭 OpenMemory Python SDK - Sector Routing Benchmark')
+    print('===================================================')
+
+    classifier = SectorClassifier()
+    patterns = [
+        (sector, re.compile(src, FLAGS), cfg['weight'])
+        for sector, cfg in SECTOR_CONFIGS.items() for src in cfg['patterns']
+    ]
+    corpus = SAMPLES * 500
+
+    # 1. Local classification cost
+    print('\n1. Local classification latency...')
+    start_time = time.perf_counter()
+    for text in corpus:
+        naive_scores(patterns, text)
+    naive_time = (time.perf_counter() - start_time) / len(corpus)
+
+    start_time = time.perf_counter()
+    for text in corpus:
+        classifier.scores(text)
+    table_time = (time.perf_counter() - start_time) / len(corpus)
+
+    agree = sum(classifier.scores(t) == naive_scores(patterns, t) for t in SAMPLES)
+    print(f'   Per-pattern loop: {naive_time * 1e6:.1f}us per text')
+    print(f'   Keyword table:    {table_time * 1e6:.1f}us per text')
+    print(f'   Score agreement:  {agree}/{len(SAMPLES)}')
+
+    if not server:
+        print('\nPass a server URL to compare against the backend:')
+        print(f'   python {os.path.basename(__file__)} http://localhost:8080')
+        return
+
+    client = OpenMemory(base_url=server)
+
+    # 2. Accuracy versus the server's classification (adds the samples)
+    print('\n2. Accuracy versus server classification...')
+    matched = 0
+    added = []
+    for text in SAMPLES:
+        memory = client.add(text)
+        added.append(memory['id'])
+        local = classifier.predict_sectors(text)
+        same = local == memory['sectors']
+        matched += same
+        print(f'   {"✅" if same else "❌"} {memory["sectors"]} {text[:48]}')
+    print(f'✅ Matched {matched}/{len(SAMPLES)} ({matched / len(SAMPLES):.0%})')
+
+    # 3. Query latency with and without client routing
+    print('\n3. Query latency by routing mode...')
+    for route in (None, 'primary'):
+        times = []
+        for text in SAMPLES:
+            start_time = time.perf_counter()
+            client.query(text, k=5, route=route)
+            times.append(time.perf_counter() - start_time)
+        print(f'   route={route!s:8} {sum(times) / len(times) * 1000:.1f}ms average')
+
+    for memory_id in added:
+        client.delete(memory_id)
+
+
+if __name__ == '__main__':
+    sector_routing_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -11,5 +11,29 @@
 __description__ = "Brain-inspired memory system client for Python applications"
 
 from .client import OpenMemory
+from .balancer import LoadBalancer
+from .sectors import SECTOR_CONFIGS, SectorClassifier, classify_content
+from .embedding import Embedder
+from .cache import EmbeddingCache
+from .batching import MicroBatcher
+from .graph import WaypointGraph
+from .store import VectorStore
+from .local import LocalMemory
+from .shard import ShardedMemory
+from .tenants import TenantMemory
 
-__all__ = ["OpenMemory"]
\ No newline at end of file
+__all__ = [
+    "OpenMemory",
+    "LoadBalancer",
+    "SECTOR_CONFIGS",
+    "SectorClassifier",
+    "classify_content",
+    "Embedder",
+    "EmbeddingCache",
+    "MicroBatcher",
+    "WaypointGraph",
+    "VectorStore",
+    "LocalMemory",
+    "ShardedMemory",
+    "TenantMemory",
+]
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Endpoint selection for multi-replica OpenMemory deployments.
+
+Every backend replica owns its own SQLite file, so reads can be spread
+across replicas while writes must always land on a single primary.
+"""
+
+import json
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Optional, Any
+
+
+class Endpoint:
+    """Runtime state for one backend URL."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'outstanding': self.outstanding,
+            'ewma_ms': None if self.ewma is None else self.ewma * 1000,
+            'requests': self.requests,
+            'errors': self.errors,
+            'ejected': self.ejected_until > time.monotonic()
+        }
+
+
+class LoadBalancer:
+    """
+    Picks a backend endpoint per request.
+
+    Policies:
+    - least_outstanding: fewest in-flight requests wins
+    - ewma: lowest latency EWMA weighted by in-flight requests wins
+
+    Endpoints that fail ``max_failures`` times in a row, or fail a ``/health``
+    probe, are ejected for ``eject_seconds``. Writes always go to the primary.
+    """
+
+    POLICIES = ('least_outstanding', 'ewma')
+
+    def __init__(self, urls: List[str], policy: str = 'least_outstanding',
+                 primary: Optional[str] = None, api_key: str = '',
+                 health_interval: float = 10.0, max_failures: int = 3,
+                 eject_seconds: float = 30.0, alpha: float = 0.3):
+        """
+        Args:
+            urls: Backend replica URLs
+            policy: Read balancing policy ('least_outstanding' or 'ewma')
+            primary: URL that receives writes (defaults to the first URL)
+            api_key: Bearer token used for health probes
+            health_interval: Seconds between background /health probes (0 disables)
+            max_failures: Consecutive failures before an endpoint is ejected
+            eject_seconds: How long an ejected endpoint is skipped
+            alpha: EWMA smoothing factor for latency samples
+        """
+        if not urls:
+            raise ValueError('at least one endpoint URL is required')
+        if policy not in self.POLICIES:
+            raise ValueError(f'unknown policy: {policy}')
+        self.endpoints = [Endpoint(u) for u in urls]
+        self.policy = policy
+        self.k = api_key
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        want = (primary or urls[0]).rstrip('/')
+        match = [e for e in self.endpoints if e.url == want]
+        if not match:
+            raise ValueError(f'primary {primary} is not one of the endpoints')
+        self.primary = match[0]
+
+        if health_interval > 0 and len(self.endpoints) > 1:
+            self._thread = threading.Thread(
+                target=self._health_loop, args=(health_interval,), daemon=True
+            )
+            self._thread.start()
+
+    def pick(self, write: bool = False, exclude: Optional[List[Endpoint]] = None) -> Endpoint:
+        """Choose the endpoint for the next request and mark it in flight."""
+        with self._lock:
+            if write:
+                ep = self.primary
+            else:
+                now = time.monotonic()
+                pool = [e for e in self.endpoints if not exclude or e not in exclude]
+                live = [e for e in pool if e.available(now)]
+                if live:
+                    ep = min(live, key=self._cost)
+                else:
+                    # Everything is ejected: try whichever comes back first
+                    ep = min(pool or self.endpoints, key=lambda e: e.ejected_until)
+            ep.outstanding += 1
+            ep.requests += 1
+            return ep
+
+    def _cost(self, ep: Endpoint) -> float:
+        if self.policy == 'ewma':
+            # Unmeasured endpoints cost nothing so they get probed first
+            return (ep.ewma or 0.0) * (ep.outstanding + 1)
+        return ep.outstanding
+
+    def done(self, ep: Endpoint, elapsed: float, ok: bool) -> None:
+        """Record the outcome of a request started with pick()."""
+        with self._lock:
+            ep.outstanding -= 1
+            if ok:
+                ep.failures = 0
+                ep.ewma = elapsed if ep.ewma is None else (
+                    self.alpha * elapsed + (1 - self.alpha) * ep.ewma
+                )
+                return
+            ep.errors += 1
+            ep.failures += 1
+            if ep.failures >= self.max_failures:
+                self._eject(ep)
+
+    def _eject(self, ep: Endpoint) -> None:
+        ep.ejected_until = time.monotonic() + self.eject_seconds
+        ep.failures = 0
+
+    def check_health(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """Probe every endpoint's /health route, ejecting or restoring each."""
+        headers = {'authorization': 'Bearer ' + self.k} if self.k else {}
+        out = {}
+        for ep in self.endpoints:
+            try:
+                req = urllib.request.Request(ep.url + '/health', headers=headers)
+                with urllib.request.urlopen(req, timeout=timeout) as r:
+                    ok = bool(json.loads(r.read().decode()).get('ok'))
+            except Exception:
+                ok = False
+            with self._lock:
+                if ok:
+                    ep.ejected_until = 0.0
+                    ep.failures = 0
+                elif ep.available(time.monotonic()):
+                    self._eject(ep)
+            out[ep.url] = ok
+        return out
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.check_health()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-endpoint counters for monitoring."""
+        with self._lock:
+            return [e.stats() for e in self.endpoints]
+
+    def close(self) -> None:
+        """Stop the background health checker."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
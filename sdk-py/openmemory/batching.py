@@ -0,0 +1,125 @@
+"""
+Micro-batching scheduler for local embeddings.
+
+Concurrent ``add``/``query`` calls each need one vector per sector. Instead of
+one model call per (text, sector), requests are queued per sector and flushed
+as a single ``Embedder.embed_batch`` call once ``max_batch`` items are waiting
+or the oldest request has waited ``max_wait_ms``.
+"""
+
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from .embedding import Embedder, mean_vector
+
+
+class MicroBatcher:
+    """
+    Gathers embed requests into per-sector batches on a background thread.
+
+    Args:
+        embedder: Embedder used for the batched model calls
+        max_batch: Flush a sector queue once it holds this many texts
+        max_wait_ms: Latency ceiling for the oldest queued request
+    """
+
+    def __init__(self, embedder: Embedder, max_batch: int = 64, max_wait_ms: float = 2.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queues: Dict[str, List[Tuple[str, Future, float]]] = {}
+        self._cv = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._run, name='openmemory-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str, sector: str) -> Future:
+        """Queue one text and return a Future for its vector."""
+        fut: Future = Future()
+        with self._cv:
+            if self._closed:
+                raise RuntimeError('batcher is closed')
+            q = self._queues.setdefault(sector, [])
+            q.append((text, fut, time.monotonic()))
+            if len(q) == 1 or len(q) >= self.max_batch:
+                self._cv.notify()
+        return fut
+
+    def embed(self, text: str, sector: str) -> array:
+        """Embed one text, sharing a model call with concurrent requests."""
+        return self.submit(text, sector).result()
+
+    def embed_many(self, texts: List[str], sector: str) -> List[array]:
+        futs = [self.submit(t, sector) for t in texts]
+        return [f.result() for f in futs]
+
+    def embed_multi_sector(self, text: str, sectors: List[str],
+                           chunks: Optional[List[str]] = None) -> List[Dict]:
+        """Batched equivalent of ``Embedder.embed_multi_sector``."""
+        parts = chunks if chunks and len(chunks) > 1 else [text]
+        futs = {s: [self.submit(p, s) for p in parts] for s in sectors}
+        out = []
+        for sector in sectors:
+            vec = mean_vector([f.result() for f in futs[sector]])
+            out.append({'sector': sector, 'vector': vec, 'dim': len(vec)})
+        return out
+
+    def _next_batch(self) -> Optional[Tuple[str, List[Tuple[str, Future, float]]]]:
+        # Called with the condition held; blocks until a batch is due
+        while True:
+            now = time.monotonic()
+            due = None
+            wake = None
+            for sector, q in self._queues.items():
+                if not q:
+                    continue
+                deadline = q[0][2] + self.max_wait
+                if len(q) >= self.max_batch or deadline <= now or self._closed:
+                    due = sector
+                    break
+                wake = deadline if wake is None else min(wake, deadline)
+            if due is not None:
+                q = self._queues[due]
+                batch, self._queues[due] = q[:self.max_batch], q[self.max_batch:]
+                return due, batch
+            if self._closed:
+                return None
+            self._cv.wait(None if wake is None else wake - now)
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                nxt = self._next_batch()
+            if nxt is None:
+                return
+            sector, batch = nxt
+            try:
+                vecs = self.embedder.embed_batch([t for t, _, _ in batch], sector)
+            except Exception as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, fut, _), vec in zip(batch, vecs):
+                fut.set_result(vec)
+
+    def stats(self) -> Dict[str, float]:
+        """Number of model calls made and the mean batch size."""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch': self.items / self.batches if self.batches else 0.0
+        }
+
+    def close(self) -> None:
+        """Flush whatever is queued and stop the scheduler thread."""
+        with self._cv:
+            self._closed = True
+            self._cv.notify()
+        self._thread.join()
@@ -0,0 +1,189 @@
+"""
+Bitmap inverted indexes over memory tags and metadata.
+
+Every memory gets an ordinal, and every (field, value) pair a bitmap (a Python
+int with bit ``n`` set for memory ``n``). A filter is answered with bitwise
+AND/OR over those ints, so no row has to be read or JSON-parsed; only the
+memories that survive are handed to vector scoring.
+"""
+
+import json
+import re
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+TAG = '#tag'
+_NONZERO = re.compile(rb'[^\x00]')
+
+
+def _value_key(value: Any) -> str:
+    # 1, '1' and True are different filter values
+    return json.dumps(value, sort_keys=True)
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+class BitmapIndex:
+    """
+    Tag and metadata bitmaps for filtered search.
+
+    Args:
+        metadata_keys: Top-level metadata keys to index (None indexes all);
+            list values are indexed element by element
+    """
+
+    def __init__(self, metadata_keys: Optional[Sequence[str]] = None):
+        self.metadata_keys = None if metadata_keys is None else set(metadata_keys)
+        self.names: List[str] = []
+        self.ordinals: Dict[str, int] = {}
+        self._alive = 0
+        self._removed: List[int] = []
+        # field -> value -> bitmap; bits of removed memories are only cleared
+        # from the live bitmap, which every match starts from
+        self.bitmaps: Dict[str, Dict[str, int]] = {}
+        # New ordinals are buffered and folded in bulk on the next match:
+        # OR-ing one bit into a big int copies the whole int
+        self._pending: Dict[str, Dict[str, List[int]]] = {}
+        self._folded = 0
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def indexed(self, key: str) -> bool:
+        return self.metadata_keys is None or key in self.metadata_keys
+
+    def add(self, id: str, tags: Optional[Iterable[str]] = None,
+            metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Index one memory and return its ordinal."""
+        if id in self.ordinals:
+            self.remove(id)
+        n = len(self.names)
+        self.names.append(id)
+        self.ordinals[id] = n
+        pairs = [(TAG, _value_key(t)) for t in set(tags or ())]
+        for key, value in (metadata or {}).items():
+            if not self.indexed(key):
+                continue
+            values = value if isinstance(value, list) else [value]
+            for v in values:
+                try:
+                    pairs.append((key, _value_key(v)))
+                except TypeError:
+                    continue
+        for field, value in pairs:
+            self._pending.setdefault(field, {}).setdefault(value, []).append(n)
+        return n
+
+    def remove(self, id: str) -> bool:
+        n = self.ordinals.pop(id, None)
+        if n is None:
+            return False
+        self._removed.append(n)
+        return True
+
+    @staticmethod
+    def _bits(ordinals: Iterable[int], size: int) -> int:
+        buf = bytearray((size + 7) // 8)
+        for n in ordinals:
+            buf[n >> 3] |= 1 << (n & 7)
+        return int.from_bytes(buf, 'little')
+
+    @property
+    def alive(self) -> int:
+        """Bitmap of every live memory."""
+        if self._folded < len(self.names) or self._removed:
+            n = len(self.names)
+            self._alive |= self._bits(range(self._folded, n), n)
+            if self._removed:
+                self._alive &= ~self._bits(self._removed, n)
+                self._removed = []
+            self._folded = n
+        return self._alive
+
+    def bitmap(self, field: str, value: Any) -> int:
+        """Bitmap of the memories indexed with ``field`` = ``value``."""
+        key = _value_key(value)
+        col = self.bitmaps.setdefault(field, {})
+        pending = self._pending.get(field, {}).pop(key, None)
+        if pending:
+            col[key] = col.get(key, 0) | self._bits(pending, pending[-1] + 1)
+        return col.get(key, 0)
+
+    def match(self, tags: Optional[Iterable[str]] = None,
+              metadata: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Bitmap of live memories that have every tag and every metadata value.
+
+        A list as a metadata value matches any of its elements.
+        """
+        bits = self.alive
+        if isinstance(tags, str):
+            tags = [tags]
+        for tag in tags or ():
+            bits &= self.bitmap(TAG, tag)
+            if not bits:
+                return 0
+        for key, value in (metadata or {}).items():
+            if not self.indexed(key):
+                raise ValueError(f'metadata key {key!r} is not indexed')
+            any_of = 0
+            for v in (value if isinstance(value, list) else [value]):
+                any_of |= self.bitmap(key, v)
+            bits &= any_of
+            if not bits:
+                return 0
+        return bits
+
+    @staticmethod
+    def _ordinals(bits: int) -> List[int]:
+        out = []
+        raw = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        # The regex skips zero bytes in C, so sparse bitmaps cost little
+        for m in _NONZERO.finditer(raw):
+            base = m.start() * 8
+            byte = raw[m.start()]
+            for j in range(8):
+                if byte >> j & 1:
+                    out.append(base + j)
+        return out
+
+    def ids(self, bits: int) -> List[str]:
+        """Memory ids for the set bits of ``bits``."""
+        return list(map(self.names.__getitem__, self._ordinals(bits)))
+
+    def compact(self) -> None:
+        """Drop removed memories from every bitmap and renumber the live ones."""
+        for field, values in self._pending.items():
+            col = self.bitmaps.setdefault(field, {})
+            for key, pending in values.items():
+                col[key] = col.get(key, 0) | self._bits(pending, pending[-1] + 1)
+        self._pending = {}
+        alive = self.alive
+        live = self._ordinals(alive)
+        remap = array('i', [-1]) * len(self.names)
+        for new, n in enumerate(live):
+            remap[n] = new
+        size = len(live)
+        bitmaps: Dict[str, Dict[str, int]] = {}
+        for field, col in self.bitmaps.items():
+            for key, bits in col.items():
+                members = self._ordinals(bits & alive)
+                if members:
+                    bitmaps.setdefault(field, {})[key] = self._bits(map(remap.__getitem__, members), size)
+        self.bitmaps = bitmaps
+        self.names = [self.names[n] for n in live]
+        self.ordinals = {name: n for n, name in enumerate(self.names)}
+        self._alive = (1 << size) - 1
+        self._folded = size
+
+    def contains(self, bits: int, id: str) -> bool:
+        n = self.ordinals.get(id)
+        return n is not None and bool(bits >> n & 1)
+
+    def stats(self) -> Dict[str, int]:
+        fields = set(self.bitmaps) | set(self._pending)
+        values = {(f, v) for f in fields
+                  for v in list(self.bitmaps.get(f, {})) + list(self._pending.get(f, {}))}
+        return {'memories': len(self.ordinals), 'fields': len(fields), 'values': len(values)}
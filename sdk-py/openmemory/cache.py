@@ -0,0 +1,180 @@
+"""
+Content-hash keyed embedding cache.
+
+Entries are keyed by a hash of (model, sector, text). Lookups go through an
+in-memory LRU first and then an optional on-disk tier: an append-only float32
+file read through ``mmap`` plus a key file that is loaded into a dict on open.
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Optional
+
+KEY_BYTES = 16
+
+
+def cache_key(text: str, sector: str, model: str) -> bytes:
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    h.update(model.encode())
+    h.update(b'\0')
+    h.update(sector.encode())
+    h.update(b'\0')
+    h.update(text.encode())
+    return h.digest()
+
+
+class _DiskSegment:
+    """Append-only vectors of one dimension: ``keys-<dim>.bin`` + ``vectors-<dim>.f32``."""
+
+    def __init__(self, directory: str, dim: int):
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.keys_path = os.path.join(directory, f'keys-{dim}.bin')
+        self.vecs_path = os.path.join(directory, f'vectors-{dim}.f32')
+        self.rows: Dict[bytes, int] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._mapped_rows = 0
+
+        keys = b''
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'rb') as f:
+                keys = f.read()
+        vec_rows = os.path.getsize(self.vecs_path) // self.row_bytes if os.path.exists(self.vecs_path) else 0
+        # A crash can leave a torn tail; only rows present in both files count
+        n = min(len(keys) // KEY_BYTES, vec_rows)
+        for i in range(n):
+            self.rows[keys[i * KEY_BYTES:(i + 1) * KEY_BYTES]] = i
+        self.count = n
+        self._truncate(self.keys_path, n * KEY_BYTES)
+        self._truncate(self.vecs_path, n * self.row_bytes)
+        self._keys = open(self.keys_path, 'ab')
+        self._vecs = open(self.vecs_path, 'ab')
+
+    @staticmethod
+    def _truncate(path: str, size: int) -> None:
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+
+    def get(self, key: bytes) -> Optional[array]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if row >= self._mapped_rows:
+            self._remap()
+        off = row * self.row_bytes
+        vec = array('f')
+        vec.frombytes(self._mm[off:off + self.row_bytes])
+        return vec
+
+    def _remap(self) -> None:
+        self._vecs.flush()
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = None
+        self._mapped_rows = 0
+        if self.count:
+            with open(self.vecs_path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_rows = self.count
+
+    def put(self, key: bytes, vec: array) -> None:
+        if key in self.rows:
+            return
+        # Vector before key: a key is never visible without its vector
+        self._vecs.write(vec.tobytes())
+        self._vecs.flush()
+        self._keys.write(key)
+        self._keys.flush()
+        self.rows[key] = self.count
+        self.count += 1
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._keys.close()
+        self._vecs.close()
+
+
+class EmbeddingCache:
+    """
+    Two-tier (memory LRU + mmap disk) embedding cache with hit-rate stats.
+
+    Args:
+        path: Directory for the persistent tier (None keeps memory only)
+        max_items: Capacity of the in-memory LRU tier
+    """
+
+    def __init__(self, path: Optional[str] = None, max_items: int = 10000):
+        self.path = path
+        self.max_items = max_items
+        self._lru: 'OrderedDict[bytes, array]' = OrderedDict()
+        self._segments: Dict[int, _DiskSegment] = {}
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+            for name in os.listdir(path):
+                if name.startswith('keys-') and name.endswith('.bin'):
+                    dim = int(name[5:-4])
+                    self._segments[dim] = _DiskSegment(path, dim)
+
+    def get(self, text: str, sector: str, model: str) -> Optional[array]:
+        key = cache_key(text, sector, model)
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.hits_memory += 1
+                return vec
+            for seg in self._segments.values():
+                vec = seg.get(key)
+                if vec is not None:
+                    self.hits_disk += 1
+                    self._remember(key, vec)
+                    return vec
+            self.misses += 1
+            return None
+
+    def put(self, text: str, sector: str, model: str, vec: array) -> None:
+        key = cache_key(text, sector, model)
+        with self._lock:
+            self._remember(key, vec)
+            if self.path:
+                seg = self._segments.get(len(vec))
+                if seg is None:
+                    seg = self._segments[len(vec)] = _DiskSegment(self.path, len(vec))
+                seg.put(key, vec)
+
+    def _remember(self, key: bytes, vec: array) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Lookup counters and hit rates for both tiers."""
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                'lookups': lookups,
+                'hits_memory': self.hits_memory,
+                'hits_disk': self.hits_disk,
+                'misses': self.misses,
+                'hit_rate': (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                'memory_items': len(self._lru),
+                'disk_items': sum(s.count for s in self._segments.values())
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for seg in self._segments.values():
+                seg.close()
+            self._segments = {}
@@ -9,10 +9,22 @@
 - Memory reinforcement and salience tracking
 """
 
+import http.client
+import io
 import json
+import threading
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
 from typing import Dict, List, Optional, Union, Any
 
+from .balancer import LoadBalancer
+from .dedup import DedupStats, SimHashIndex, simhash
+from .sectors import predict_sectors
+
+READ_PATHS = ('/memory/query',)
+
 
 class OpenMemory:
     """
@@ -26,16 +38,44 @@ class OpenMemory:
     - Reflective: Meta memory & logs (audit trail)
     """
     
-    def __init__(self, api_key: str = '', base_url: str = 'http://localhost:8080'):
+    def __init__(self, api_key: str = '', base_url: Union[str, List[str]] = 'http://localhost:8080',
+                 policy: str = 'least_outstanding', primary: Optional[str] = None,
+                 health_interval: float = 10.0, keep_alive: bool = False,
+                 dedup: bool = False, dedup_distance: int = 4):
         """
         Initialize OpenMemory client.
         
         Args:
             api_key: Optional Bearer token for authentication
-            base_url: Backend server URL
+            base_url: Backend server URL, or a list of replica URLs
+            policy: Read balancing policy when several URLs are given
+                ('least_outstanding' or 'ewma')
+            primary: Replica that receives writes (defaults to the first URL)
+            health_interval: Seconds between /health probes of the replicas
+            keep_alive: Reuse one HTTP connection per thread and backend
+                instead of opening a socket per request
+            dedup: Reinforce near-duplicates of memories added through this
+                client instead of sending them again (SimHash pre-filter)
+            dedup_distance: Largest SimHash Hamming distance treated as a
+                duplicate. The default catches case and punctuation changes,
+                not one-word edits of short texts (see ``SimHashIndex``)
+
+        The server has no per-user namespaces, so neither does this client;
+        ``TenantMemory`` keeps one local engine per ``user_id``.
         """
         self.k = api_key
-        self.u = base_url.rstrip('/')
+        self.keep_alive = keep_alive
+        self._tl = threading.local()
+        self._dedup = SimHashIndex(dedup_distance) if dedup else None
+        self._dedup_lock = threading.Lock()
+        self.dedup_stats = DedupStats()
+        self.lb: Optional[LoadBalancer] = None
+        if isinstance(base_url, str):
+            self.u = base_url.rstrip('/')
+        else:
+            self.lb = LoadBalancer(list(base_url), policy=policy, primary=primary,
+                                   api_key=api_key, health_interval=health_interval)
+            self.u = self.lb.primary.url
     
     def _r(self, method: str, path: str, body: Optional[Dict] = None) -> Dict[str, Any]:
         """Internal request method."""
@@ -47,10 +87,82 @@ def _r(self, method: str, path: str, body: Optional[Dict] = None) -> Dict[str, A
         if body is not None:
             data = json.dumps(body).encode()
         
-        req = urllib.request.Request(self.u + path, method=method, headers=headers, data=data)
+        if self.lb is None:
+            return self._send(self.u, method, path, headers, data)
+        return self._send_balanced(method, path, headers, data)
+    
+    def _send(self, base: str, method: str, path: str, headers: Dict[str, str],
+              data: Optional[bytes]) -> Dict[str, Any]:
+        if self.keep_alive:
+            return self._send_pooled(base, method, path, headers, data)
+        req = urllib.request.Request(base + path, method=method, headers=headers, data=data)
         with urllib.request.urlopen(req, timeout=60) as r:
             return json.loads(r.read().decode())
     
+    def _send_pooled(self, base: str, method: str, path: str, headers: Dict[str, str],
+                     data: Optional[bytes]) -> Dict[str, Any]:
+        conns = getattr(self._tl, 'conns', None)
+        if conns is None:
+            conns = self._tl.conns = {}
+        url = urllib.parse.urlsplit(base)
+        reused = base in conns
+        if not reused:
+            cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+            conns[base] = cls(url.netloc, timeout=60)
+        conn = conns[base]
+        try:
+            conn.request(method, url.path + path, body=data, headers=headers)
+            r = conn.getresponse()
+            raw = r.read()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            del conns[base]
+            # An idle keep-alive socket may have been closed by the server
+            if reused and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError,
+                                         ConnectionResetError)):
+                return self._send_pooled(base, method, path, headers, data)
+            raise urllib.error.URLError(e)
+        if r.status >= 400:
+            raise urllib.error.HTTPError(base + path, r.status, r.reason, r.headers, io.BytesIO(raw))
+        return json.loads(raw.decode())
+    
+    def _send_balanced(self, method: str, path: str, headers: Dict[str, str],
+                       data: Optional[bytes]) -> Dict[str, Any]:
+        # Each replica has its own store, so anything that mutates state
+        # must go to the primary; reads may be retried on another replica.
+        write = method != 'GET' and path not in READ_PATHS
+        tried = []
+        while True:
+            ep = self.lb.pick(write=write, exclude=tried)
+            t0 = time.perf_counter()
+            try:
+                res = self._send(ep.url, method, path, headers, data)
+            except urllib.error.HTTPError as e:
+                self.lb.done(ep, time.perf_counter() - t0, ok=e.code < 500)
+                raise
+            except (urllib.error.URLError, OSError):
+                self.lb.done(ep, time.perf_counter() - t0, ok=False)
+                tried.append(ep)
+                if write or len(tried) >= len(self.lb.endpoints):
+                    raise
+                continue
+            self.lb.done(ep, time.perf_counter() - t0, ok=True)
+            return res
+    
+    def endpoints(self) -> List[Dict[str, Any]]:
+        """Per-replica request counters, latency EWMA and ejection state."""
+        if self.lb is None:
+            return [{'url': self.u}]
+        return self.lb.stats()
+    
+    def close(self) -> None:
+        """Stop background replica health checks and drop this thread's connections."""
+        if self.lb is not None:
+            self.lb.close()
+        for conn in getattr(self._tl, 'conns', {}).values():
+            conn.close()
+        self._tl.conns = {}
+    
     def health(self) -> Dict[str, bool]:
         """Check server health status."""
         return self._r('GET', '/health')
@@ -73,18 +185,33 @@ def add(self, content: str, tags: Optional[List[str]] = None,
             decay_lambda: Custom decay rate (overrides sector default)
             
         Returns:
-            Dict with memory ID and assigned sector
+            Dict with memory ID and assigned sector; with ``dedup`` enabled, a
+            near-duplicate returns the earlier ID with ``deduplicated: True``
         """
-        return self._r('POST', '/memory/add', {
+        start = time.perf_counter()
+        fp = simhash(content) if self._dedup is not None else None
+        if fp is not None:
+            with self._dedup_lock:
+                hit = self._dedup.find(fp)
+            self.dedup_stats.record(start, hit is not None)
+            if hit:
+                self.reinforce(hit[0])
+                return {'id': hit[0], 'deduplicated': True}
+        res = self._r('POST', '/memory/add', {
             'content': content,
             'tags': tags or [],
             'metadata': metadata or {},
             'salience': salience,
             'decay_lambda': decay_lambda
         })
+        if fp is not None and res.get('id'):
+            with self._dedup_lock:
+                self._dedup.add(res['id'], fp)
+        return res
     
     def query(self, query: str, k: int = 8, 
-              filters: Optional[Dict[str, Union[str, int, float, List[str]]]] = None) -> Dict[str, Any]:
+              filters: Optional[Dict[str, Union[str, int, float, List[str]]]] = None,
+              route: Optional[str] = None) -> Dict[str, Any]:
         """
         Query memories with vector similarity search.
         
@@ -95,14 +222,25 @@ def query(self, query: str, k: int = 8,
                 - sector: Specific brain sector to search
                 - min_score: Minimum similarity score
                 - tags: Tag filters
+            route: Client-side sector routing when no sector filter is given:
+                - 'primary': only search the predicted primary sector
+                There is no per-sector fan-out: the server reinforces the
+                top-k of every query it answers, so one query per sector
+                would boost a memory found in several sectors several times.
+                An unrouted query already searches every predicted sector
                 
         Returns:
             Dict with query and matched memories (includes sector info)
         """
+        filters = dict(filters or {})
+        if route and not filters.get('sector'):
+            if route != 'primary':
+                raise ValueError(f'unknown route: {route}')
+            filters['sector'] = predict_sectors(query)[0]
         return self._r('POST', '/memory/query', {
             'query': query,
             'k': k,
-            'filters': filters or {}
+            'filters': filters
         })
     
     def query_sector(self, query: str, sector: str, k: int = 8) -> Dict[str, Any]:
@@ -158,6 +296,9 @@ def delete(self, memory_id: str) -> Dict[str, bool]:
         Args:
             memory_id: Memory ID to delete
         """
+        if self._dedup is not None:
+            with self._dedup_lock:
+                self._dedup.remove(memory_id)
         return self._r('DELETE', f'/memory/{memory_id}')
     
     def reinforce(self, memory_id: str, boost: float = 0.1) -> Dict[str, Any]:
@@ -0,0 +1,107 @@
+"""
+Online tombstone compaction for the local engine.
+
+Deleting a memory only marks its vector rows dead, and the waypoint graph,
+lexical and bitmap indexes keep a slot for it, so scans and files grow with
+every memory ever stored. ``CompactionJob`` rewrites each vector store
+without its dead rows (see ``VectorStore.compact``) and then renumbers the
+in-memory indexes. The long copy runs without the engine lock, so queries
+and writes carry on; only the catch-up and file swap of each store, and the
+index renumbering, hold it.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class CompactionJob:
+    """
+    One compaction pass over an engine, run inline or on a background thread.
+
+    Args:
+        engine: ``LocalMemory`` to compact
+        min_dead_ratio: Stores with a smaller share of dead rows are skipped
+        retrain: Retrain PQ codebooks on the live rows of the stores compacted
+    """
+
+    def __init__(self, engine, min_dead_ratio: float = 0.0, retrain: bool = False):
+        self.engine = engine
+        self.min_dead_ratio = min_dead_ratio
+        self.retrain = retrain
+        self.state = 'pending'
+        self.store: Optional[str] = None
+        self.done = 0
+        self.total = 0
+        self.stores: Dict[str, Dict[str, Any]] = {}
+        self.indexes: Dict[str, Any] = {}
+        self.elapsed_ms = 0.0
+        self._start = 0.0
+        self.error: Optional[BaseException] = None
+        self._finished = threading.Event()
+        self._thread = None
+
+    def _progress(self, done: int, total: int) -> None:
+        self.done, self.total = done, total
+
+    def run(self) -> Dict[str, Any]:
+        """Compact every store over the threshold, then the indexes."""
+        self._start = time.perf_counter()
+        self.state = 'running'
+        try:
+            for name, store in self.engine._vector_stores().items():
+                dead = len(store.dead)
+                if not dead or dead / len(store.ids) < self.min_dead_ratio:
+                    continue
+                self.store, self.done, self.total = name, 0, len(store.ids) - dead
+                self.stores[name] = store.compact(
+                    self.engine._synced, self.retrain, self._progress,
+                    lambda keep, name=name: self.engine._remap_rows(name, keep))
+            self.store = None
+            self.indexes = self.engine._compact_indexes()
+            self.state = 'done'
+        except BaseException as e:
+            self.error = e
+            self.state = 'failed'
+            raise
+        finally:
+            self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+            self._finished.set()
+        return self.progress()
+
+    def start(self) -> 'CompactionJob':
+        self._thread = threading.Thread(target=self._run_quietly, name='openmemory-compaction', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run_quietly(self) -> None:
+        try:
+            self.run()
+        except BaseException:
+            # Kept in ``error`` and reported by progress()
+            pass
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Block until the job ends and return its final progress."""
+        self._finished.wait(timeout)
+        return self.progress()
+
+    def progress(self) -> Dict[str, Any]:
+        """
+        State ('pending', 'running', 'done' or 'failed'), the store being
+        copied with its rows done and total, and per-store results.
+        """
+        elapsed = self.elapsed_ms
+        if self.state == 'running':
+            elapsed = (time.perf_counter() - self._start) * 1000
+        return {
+            'state': self.state,
+            'store': self.store,
+            'done': self.done,
+            'total': self.total,
+            'stores': dict(self.stores),
+            'indexes': self.indexes,
+            'reclaimed_bytes': sum(s['reclaimed_bytes'] for s in self.stores.values()),
+            'elapsed_ms': elapsed,
+            'error': repr(self.error) if self.error is not None else None
+        }
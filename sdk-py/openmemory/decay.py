@@ -0,0 +1,117 @@
+"""
+Lazy salience decay and an incremental background compactor.
+
+The server's ``runDecayProcess`` rewrites every memory row in one sweep. The
+local engine instead derives the current salience at read time:
+
+    salience * exp(-decay_lambda * days since decay_ts)
+
+where ``decay_ts`` is the time the stored salience was last brought up to
+date (the last access, or the last compaction). ``DecayCompactor`` persists
+that value a bounded batch at a time within a per-run time budget, so no
+operation ever touches the whole table. Because exponential decay is
+memoryless, reads return the same salience before and after compaction.
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+DAY_MS = 1000 * 60 * 60 * 24
+DEFAULT_LAMBDA = 0.02
+
+
+def decayed_salience(salience: float, decay_lambda: Optional[float],
+                     since: Optional[int], now: int) -> float:
+    """Salience at ``now`` given its value at ``since`` (both ms)."""
+    if salience is None:
+        return 0.0
+    if since is None:
+        return salience
+    days = max(0, now - since) / DAY_MS
+    return max(0.0, salience * math.exp(-(decay_lambda or DEFAULT_LAMBDA) * days))
+
+
+class DecayCompactor:
+    """
+    Persists decayed salience in small batches on a background thread.
+
+    Each run walks the table in rowid order from where the previous run
+    stopped and ends when ``budget_ms`` is spent; a full pass therefore
+    spreads over as many runs as it needs.
+
+    Args:
+        engine: ``LocalMemory`` providing ``_decay_batch``
+        batch_size: Rows per UPDATE statement
+        budget_ms: Time budget of one run
+        interval: Seconds between background runs (None disables the thread)
+        min_age_ms: Rows brought up to date more recently than this are skipped
+    """
+
+    def __init__(self, engine, batch_size: int = 512, budget_ms: float = 10.0,
+                 interval: Optional[float] = 60.0, min_age_ms: int = 60 * 60 * 1000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.interval = interval
+        self.min_age_ms = min_age_ms
+        self.cursor = 0
+        self.passes = 0
+        self.runs = 0
+        self.processed = 0
+        self.decayed = 0
+        self.busy_ms = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        if interval:
+            self._thread = threading.Thread(target=self._loop, name='openmemory-decay', daemon=True)
+            self._thread.start()
+
+    def run_once(self, budget_ms: Optional[float] = None) -> Dict[str, float]:
+        """Decay batches until the budget is spent or a pass completes."""
+        budget = (self.budget_ms if budget_ms is None else budget_ms) / 1000
+        start = time.perf_counter()
+        processed = decayed = batches = 0
+        while True:
+            last, n, changed = self.engine._decay_batch(self.cursor, self.batch_size, self.min_age_ms)
+            batches += 1
+            processed += n
+            decayed += changed
+            if last is None:
+                # End of table: the next run starts a new pass
+                self.cursor = 0
+                self.passes += 1
+                break
+            self.cursor = last
+            if time.perf_counter() - start >= budget:
+                break
+        elapsed = (time.perf_counter() - start) * 1000
+        self.runs += 1
+        self.processed += processed
+        self.decayed += decayed
+        self.busy_ms += elapsed
+        return {'processed': processed, 'decayed': decayed, 'batches': batches, 'elapsed_ms': elapsed}
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                # The engine may be closing; the next run retries
+                continue
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'runs': self.runs,
+            'passes': self.passes,
+            'processed': self.processed,
+            'decayed': self.decayed,
+            'busy_ms': self.busy_ms,
+            'cursor': self.cursor
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,145 @@
+"""
+Near-duplicate detection with SimHash and banded LSH buckets.
+
+Each text gets a 64-bit SimHash over its words and word bigrams, so texts
+that differ by a few words get fingerprints a few bits apart. Fingerprints
+are split into ``bands`` bit ranges, and each range is a bucket key. By the
+pigeonhole principle, two fingerprints within ``bands - 1`` bits of each
+other share at least one exact band. A lookup therefore only compares
+against the memories in a handful of buckets, never the whole set.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+_WORD = re.compile(r'\w+')
+BITS = 64
+
+
+def _hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'little')
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash of ``text`` over lowercased words and word bigrams, or
+    None when it has no words (emoji or punctuation only): such texts would
+    all share one fingerprint, so they are never treated as duplicates.
+    """
+    words = _WORD.findall(text.lower())
+    features = words + [a + ' ' + b for a, b in zip(words, words[1:])]
+    if not features:
+        return None
+    # One binary string per feature; each column counts the feature bits that
+    # are set at that position
+    rows = [format(_hash(f), '064b') for f in features]
+    half = len(rows) / 2
+    fp = 0
+    for col in zip(*rows):
+        fp = fp << 1 | (col.count('1') > half)
+    return fp
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex:
+    """
+    Fingerprint index answering "is there a stored text within
+    ``max_distance`` bits of this one?".
+
+    Args:
+        max_distance: Largest Hamming distance reported as a duplicate. Case
+            and punctuation changes cost 0 bits. A one-word edit costs about
+            10 bits in a 10-word sentence and about 4 in a 40-word one, while
+            unrelated texts sharing a vocabulary can come within 13-15. The
+            default of 4 therefore only merges rewordings of long texts
+            besides case and punctuation changes; raising it catches more
+            edits but risks merging distinct memories, and every extra bit
+            adds a band, so buckets get wider and lookups slower
+    """
+
+    def __init__(self, max_distance: int = 4):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.width = BITS // self.bands
+        self.mask = (1 << self.width) - 1
+        self.fingerprints: Dict[str, int] = {}
+        self.buckets: Dict[Tuple[int, int], List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def _keys(self, fp: int) -> List[Tuple[int, int]]:
+        return [(b, fp >> (b * self.width) & self.mask) for b in range(self.bands)]
+
+    def add(self, id: str, fp: int) -> None:
+        self.remove(id)
+        self.fingerprints[id] = fp
+        for key in self._keys(fp):
+            self.buckets.setdefault(key, []).append(id)
+
+    def remove(self, id: str) -> bool:
+        fp = self.fingerprints.pop(id, None)
+        if fp is None:
+            return False
+        for key in self._keys(fp):
+            bucket = self.buckets[key]
+            bucket.remove(id)
+            if not bucket:
+                del self.buckets[key]
+        return True
+
+    def find(self, fp: int) -> Optional[Tuple[str, int]]:
+        """Closest stored id within ``max_distance`` as (id, distance), or None."""
+        best = None
+        for key in self._keys(fp):
+            for id in self.buckets.get(key, ()):
+                d = hamming(fp, self.fingerprints[id])
+                if d <= self.max_distance and (best is None or d < best[1]):
+                    best = (id, d)
+                    if not d:
+                        return best
+        return best
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'fingerprints': len(self.fingerprints),
+            'buckets': len(self.buckets),
+            'largest_bucket': max(map(len, self.buckets.values()), default=0)
+        }
+
+
+class DedupStats:
+    """Thread-safe counters for a dedup stage."""
+
+    def __init__(self):
+        self.checked = 0
+        self.duplicates = 0
+        self.races = 0
+        self.ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, start: float, duplicate: bool, recheck: bool = False) -> None:
+        """
+        Count one lookup. A ``recheck`` repeats the lookup for an already
+        counted text; its hits are duplicates that landed concurrently.
+        """
+        with self._lock:
+            self.checked += not recheck
+            self.duplicates += duplicate
+            self.races += recheck and duplicate
+            self.ms += (time.perf_counter() - start) * 1000
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'races': self.races,
+            'ratio': self.duplicates / self.checked if self.checked else 0.0,
+            'ms': self.ms
+        }
@@ -0,0 +1,152 @@
+"""
+Sector embeddings for the local engine.
+
+Mirrors the offline providers of ``backend/src/embedding`` (``synthetic`` and
+the hash-based ``local`` model) and accepts any callable for real models.
+Vectors are float32 ``array('f')`` buffers so they can be written straight to
+the on-disk stores.
+"""
+
+import hashlib
+import math
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .sectors import SECTOR_CONFIGS
+
+# fn(texts, sector) -> one vector per text
+EmbedFn = Callable[[List[str], str], Sequence[Sequence[float]]]
+
+SECTOR_SEEDS = {
+    'episodic': 0.13,
+    'semantic': 0.17,
+    'procedural': 0.19,
+    'emotional': 0.23,
+    'reflective': 0.29
+}
+
+
+def _js_len(s: str) -> int:
+    # JS string length counts UTF-16 code units
+    return len(s.encode('utf-16-le')) // 2
+
+
+def synthetic_embedding(text: str, sector: str, dim: int = 768) -> array:
+    """Port of generateSyntheticEmbedding."""
+    seed = SECTOR_SEEDS.get(sector, 0.17)
+    base = _js_len(text) * seed + _js_len(sector) * 0.11
+    return array('f', [math.fmod(math.sin(i * 0.7 + base), 1) for i in range(dim)])
+
+
+def hash_embedding(text: str, sector: str, dim: int = 768) -> array:
+    """Port of embedWithLocal: a normalised SHA-256 derived vector."""
+    h = hashlib.sha256((text + sector).encode()).digest()
+    n = len(h)
+    v = [(h[i % n] * 256 + h[(i + 1) % n]) / 65535 * 2 - 1 for i in range(dim)]
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return array('f', [x / norm for x in v])
+
+
+def mean_vector(vectors: List[array]) -> array:
+    """Mean pooling of chunk vectors (aggregateChunkVectors)."""
+    if len(vectors) == 1:
+        return vectors[0]
+    n = len(vectors)
+    return array('f', [sum(col) / n for col in zip(*vectors)])
+
+
+class Embedder:
+    """
+    Embeds text per sector for the local engine.
+
+    Args:
+        provider: 'synthetic', 'local', or a name for ``fn``
+        dim: Vector dimension
+        fn: Optional batch embedding function ``fn(texts, sector)``
+        cache: Optional ``EmbeddingCache`` consulted before embedding
+    """
+
+    def __init__(self, provider: str = 'synthetic', dim: int = 768,
+                 fn: Optional[EmbedFn] = None, cache=None):
+        if fn is None and provider not in ('synthetic', 'local'):
+            raise ValueError(f'provider {provider} needs an embedding fn')
+        self.provider = provider
+        self.dim = dim
+        self.fn = fn
+        self.cache = cache
+
+    def model(self, sector: str) -> str:
+        """Cache namespace for a sector: provider, sector model and dimension."""
+        cfg = SECTOR_CONFIGS.get(sector, {})
+        return f"{self.provider}:{cfg.get('model', sector)}:{self.dim}"
+
+    def _compute(self, texts: List[str], sector: str) -> List[array]:
+        if self.fn is not None:
+            return [array('f', v) for v in self.fn(texts, sector)]
+        if self.provider == 'synthetic':
+            # The synthetic vector only depends on text length
+            by_len: Dict[int, array] = {}
+            out = []
+            for t in texts:
+                n = _js_len(t)
+                if n not in by_len:
+                    by_len[n] = synthetic_embedding(t, sector, self.dim)
+                out.append(by_len[n])
+            return out
+        return [hash_embedding(t, sector, self.dim) for t in texts]
+
+    def embed(self, text: str, sector: str) -> array:
+        """Embed one text for one sector (embedForSector)."""
+        if sector not in SECTOR_CONFIGS:
+            raise ValueError(f'Unknown sector: {sector}')
+        if self.cache is None:
+            return self._compute([text], sector)[0]
+        model = self.model(sector)
+        vec = self.cache.get(text, sector, model)
+        if vec is None:
+            vec = self._compute([text], sector)[0]
+            self.cache.put(text, sector, model, vec)
+        return vec
+
+    def embed_batch(self, texts: List[str], sector: str) -> List[array]:
+        """
+        Embed many texts for one sector with a single model call.
+
+        Cached and repeated texts are resolved first; only the distinct
+        misses are sent to the model.
+        """
+        if sector not in SECTOR_CONFIGS:
+            raise ValueError(f'Unknown sector: {sector}')
+        model = self.model(sector)
+        found: Dict[str, array] = {}
+        todo: Dict[str, None] = {}
+        for t in texts:
+            if t in found or t in todo:
+                continue
+            vec = self.cache.get(t, sector, model) if self.cache is not None else None
+            if vec is None:
+                todo[t] = None
+            else:
+                found[t] = vec
+        if todo:
+            for t, vec in zip(todo, self._compute(list(todo), sector)):
+                found[t] = vec
+                if self.cache is not None:
+                    self.cache.put(t, sector, model, vec)
+        return [found[t] for t in texts]
+
+    def embed_multi_sector(self, text: str, sectors: List[str],
+                           chunks: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Embed text for several sectors (embedMultiSector).
+
+        Chunked content is embedded chunk by chunk and mean-pooled per sector.
+        """
+        out = []
+        for sector in sectors:
+            if chunks and len(chunks) > 1:
+                vec = mean_vector([self.embed(c, sector) for c in chunks])
+            else:
+                vec = self.embed(text, sector)
+            out.append({'sector': sector, 'vector': vec, 'dim': len(vec)})
+        return out
@@ -0,0 +1,401 @@
+"""
+In-memory waypoint graph in compressed sparse row (CSR) form.
+
+The backend keeps one SQLite row per waypoint and queries neighbours one node
+at a time. Here each node's outgoing edges are a contiguous slice of flat
+``array`` buffers, so a hop is a slice read rather than a query, and a node
+may have any number of outgoing edges.
+
+New edges land in a small delta map and are merged into the CSR arrays in
+bulk. Every mutation is also appended to ``edges.log`` so persistence is
+incremental; ``checkpoint()`` writes a fresh snapshot and truncates the log.
+"""
+
+import json
+import operator
+import os
+import time
+from array import array
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Mirrors REINFORCEMENT in backend/src/hsg
+WAYPOINT_BOOST = 0.05
+MAX_WAYPOINT_WEIGHT = 1.0
+PRUNE_THRESHOLD = 0.05
+
+
+def _now() -> int:
+    return int(time.time() * 1000)
+
+
+class WaypointGraph:
+    """
+    Directed, weighted multi-neighbour graph between memory ids.
+
+    Args:
+        path: Directory for snapshot and log files (None keeps it in memory)
+        merge_threshold: Pending edges that trigger a merge into the CSR arrays;
+            the threshold grows with the graph (1/8 of its edges) so merge
+            cost stays amortised O(1) per insert
+    """
+
+    def __init__(self, path: Optional[str] = None, merge_threshold: int = 4096):
+        self.path = path
+        self.merge_threshold = merge_threshold
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+        self.weights = array('f')
+        self.updated = array('q')
+        self._delta: Dict[int, Dict[int, Tuple[float, int]]] = {}
+        self._delta_edges = 0
+        self._dead: Set[int] = set()
+        self._log = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+            self._log = open(os.path.join(path, 'edges.log'), 'a')
+
+    # -- node ids -----------------------------------------------------------
+
+    def _node(self, name: str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.indptr.append(self.indptr[-1])
+        return i
+
+    def _row(self, i: int) -> range:
+        return range(self.indptr[i], self.indptr[i + 1])
+
+    def _find(self, src: int, dst: int) -> int:
+        a, b = self.indptr[src], self.indptr[src + 1]
+        if a == b:
+            return -1
+        try:
+            return a + self.indices[a:b].index(dst)
+        except ValueError:
+            return -1
+
+    # -- mutation -----------------------------------------------------------
+
+    def add_edge(self, src: str, dst: str, weight: float, ts: Optional[int] = None) -> None:
+        """Insert or replace the ``src -> dst`` waypoint."""
+        ts = ts or _now()
+        self._add(self._node(src), self._node(dst), weight, ts)
+        self._append(f'a\t{src}\t{dst}\t{weight!r}\t{ts}\n')
+
+    def _add(self, s: int, d: int, weight: float, ts: int) -> None:
+        if s in self._dead or d in self._dead:
+            # Purge the removed node's old edges before it is reused
+            self.merge()
+        e = self._find(s, d)
+        if e >= 0:
+            self.weights[e] = weight
+            self.updated[e] = ts
+            return
+        row = self._delta.setdefault(s, {})
+        if d not in row:
+            self._delta_edges += 1
+        row[d] = (weight, ts)
+        if self._delta_edges >= max(self.merge_threshold, len(self.indices) >> 3):
+            self.merge()
+
+    def add_edges(self, edges: Iterable[Tuple[str, str, float]], ts: Optional[int] = None) -> None:
+        """Bulk insert ``(src, dst, weight)`` tuples."""
+        ts = ts or _now()
+        ops: List[str] = []
+        for src, dst, w in edges:
+            self._add(self._node(src), self._node(dst), w, ts)
+            ops.append(f'a\t{src}\t{dst}\t{w!r}\t{ts}\n')
+        self._append_many(ops)
+
+    def weight(self, src: str, dst: str) -> Optional[float]:
+        s, d = self.ids.get(src), self.ids.get(dst)
+        if s is None or d is None or s in self._dead or d in self._dead:
+            return None
+        e = self._find(s, d)
+        if e >= 0:
+            return self.weights[e]
+        hit = self._delta.get(s, {}).get(d)
+        return hit[0] if hit else None
+
+    def remove_node(self, name: str) -> None:
+        """Drop every waypoint from or to ``name`` (del_waypoints)."""
+        i = self.ids.get(name)
+        if i is None:
+            return
+        self._dead.add(i)
+        self._delta.pop(i, None)
+        self._append(f'd\t{name}\n')
+
+    def merge(self) -> None:
+        """Fold pending edges and removals into the CSR arrays."""
+        if not self._delta and not self._dead:
+            return
+        if self._dead:
+            self._rebuild()
+        else:
+            self._splice()
+        self._delta = {}
+        self._delta_edges = 0
+        self._dead = set()
+
+    def _splice(self) -> None:
+        # Insert-only merge: copy untouched row runs in bulk and splice the
+        # pending edges in after each touched row.
+        n = len(self.names)
+        added = [0] * n
+        for s, row in self._delta.items():
+            added[s] = len(row)
+        old = self.indptr
+        indptr = array('q', map(operator.add, old, accumulate(added, initial=0)))
+        indices, weights, updated = array('i'), array('f'), array('q')
+        prev = 0
+        for s in sorted(self._delta):
+            end = old[s + 1]
+            indices.extend(self.indices[prev:end])
+            weights.extend(self.weights[prev:end])
+            updated.extend(self.updated[prev:end])
+            for d, (w, ts) in self._delta[s].items():
+                indices.append(d)
+                weights.append(w)
+                updated.append(ts)
+            prev = end
+        indices.extend(self.indices[prev:])
+        weights.extend(self.weights[prev:])
+        updated.extend(self.updated[prev:])
+        self.indptr, self.indices, self.weights, self.updated = indptr, indices, weights, updated
+
+    def _rebuild(self) -> None:
+        n = len(self.names)
+        indptr = array('q', [0])
+        indices, weights, updated = array('i'), array('f'), array('q')
+        dead = self._dead
+        for s in range(n):
+            if s not in dead:
+                for e in self._row(s):
+                    d = self.indices[e]
+                    if d not in dead:
+                        indices.append(d)
+                        weights.append(self.weights[e])
+                        updated.append(self.updated[e])
+                for d, (w, ts) in self._delta.get(s, {}).items():
+                    if d not in dead:
+                        indices.append(d)
+                        weights.append(w)
+                        updated.append(ts)
+            indptr.append(len(indices))
+        self.indptr, self.indices, self.weights, self.updated = indptr, indices, weights, updated
+
+    # -- traversal ----------------------------------------------------------
+
+    def neighbors(self, name: str) -> List[Tuple[str, float]]:
+        """Outgoing ``(dst, weight)`` pairs, heaviest first (get_neighbors)."""
+        i = self.ids.get(name)
+        if i is None:
+            return []
+        return [(self.names[d], w) for d, w in self._neighbors(i)]
+
+    def _neighbors(self, i: int) -> List[Tuple[int, float]]:
+        if i in self._dead:
+            return []
+        a, b = self.indptr[i], self.indptr[i + 1]
+        out = list(zip(self.indices[a:b], self.weights[a:b]))
+        if i in self._delta:
+            out.extend((d, w) for d, (w, _) in self._delta[i].items())
+        if self._dead:
+            out = [(d, w) for d, w in out if d not in self._dead]
+        out.sort(key=lambda x: x[1], reverse=True)
+        return out
+
+    def expand(self, seeds: Sequence[str], max_expansions: int = 10,
+               decay: float = 0.8, min_weight: float = 0.1) -> List[Dict]:
+        """
+        Breadth-first expansion from seed memories (expandViaWaypoints).
+
+        Each hop multiplies the path weight by the edge weight and ``decay``;
+        paths below ``min_weight`` are dropped. Returns dicts with ``id``,
+        ``weight`` and ``path`` in discovery order, seeds first.
+        """
+        out: List[Dict] = []
+        visited: Set[int] = set()
+        queue: List[Tuple[int, float, List[str]]] = []
+        for name in seeds:
+            out.append({'id': name, 'weight': 1.0, 'path': [name]})
+            i = self.ids.get(name)
+            if i is not None:
+                visited.add(i)
+                queue.append((i, 1.0, [name]))
+        head = 0
+        count = 0
+        while head < len(queue) and count < max_expansions:
+            i, w, path = queue[head]
+            head += 1
+            for d, ew in self._neighbors(i):
+                if d in visited:
+                    continue
+                nw = w * ew * decay
+                if nw < min_weight:
+                    continue
+                name = self.names[d]
+                p = path + [name]
+                out.append({'id': name, 'weight': nw, 'path': p})
+                visited.add(d)
+                queue.append((d, nw, p))
+                count += 1
+        return out
+
+    def boosted(self, paths: Iterable[Sequence[str]], boost: float = WAYPOINT_BOOST,
+                max_weight: float = MAX_WAYPOINT_WEIGHT) -> List[Tuple[str, str, float]]:
+        """
+        New ``(src, dst, weight)`` of every existing edge along the paths
+        after reinforcement, without applying them. An edge crossed ``n``
+        times gets ``n`` boosts.
+        """
+        counts: Dict[Tuple[str, str], int] = {}
+        for path in paths:
+            for a, b in zip(path, path[1:]):
+                counts[(a, b)] = counts.get((a, b), 0) + 1
+        edges = []
+        for (src, dst), n in counts.items():
+            w = self.weight(src, dst)
+            if w is not None:
+                edges.append((src, dst, min(max_weight, w + boost * n)))
+        return edges
+
+    def reinforce(self, paths: Iterable[Sequence[str]], boost: float = WAYPOINT_BOOST,
+                  max_weight: float = MAX_WAYPOINT_WEIGHT) -> int:
+        """
+        Boost every edge along the traversed paths in one batch
+        (reinforceWaypoints). Returns the number of distinct edges updated.
+        """
+        edges = self.boosted(paths, boost, max_weight)
+        self.add_edges(edges)
+        return len(edges)
+
+    def prune(self, threshold: float = PRUNE_THRESHOLD) -> int:
+        """Remove edges lighter than ``threshold`` (pruneWeakWaypoints)."""
+        self.merge()
+        keep = array('q', [0])
+        indices, weights, updated = array('i'), array('f'), array('q')
+        removed = 0
+        for s in range(len(self.names)):
+            for e in self._row(s):
+                if self.weights[e] < threshold:
+                    removed += 1
+                    continue
+                indices.append(self.indices[e])
+                weights.append(self.weights[e])
+                updated.append(self.updated[e])
+            keep.append(len(indices))
+        self.indptr, self.indices, self.weights, self.updated = keep, indices, weights, updated
+        self._append(f'p\t{threshold!r}\n')
+        return removed
+
+    def compact(self) -> int:
+        """
+        Merge pending changes, drop nodes without edges (removed memories
+        leave these behind) and renumber the rest. Returns the nodes dropped.
+        """
+        self.merge()
+        n = len(self.names)
+        used = bytearray(n)
+        for s in range(n):
+            if self.indptr[s + 1] > self.indptr[s]:
+                used[s] = 1
+        for d in self.indices:
+            used[d] = 1
+        remap = array('i', [-1]) * n
+        names: List[str] = []
+        for i in range(n):
+            if used[i]:
+                remap[i] = len(names)
+                names.append(self.names[i])
+        if len(names) < n:
+            # Dropped nodes have no edges, so the kept rows' offsets hold
+            self.indptr = array('q', [0]) + array('q', (self.indptr[s + 1] for s in range(n) if used[s]))
+            self.indices = array('i', map(remap.__getitem__, self.indices))
+            self.names = names
+            self.ids = {name: i for i, name in enumerate(names)}
+        self.checkpoint()
+        return n - len(names)
+
+    def edge_count(self) -> int:
+        """Stored edges, counting those of removed nodes until the next merge."""
+        return len(self.indices) + self._delta_edges
+
+    # -- persistence --------------------------------------------------------
+
+    # Log lines are tab separated: a<src><dst><weight><ts>, d<id>, p<threshold>
+
+    def _append(self, line: str) -> None:
+        if self._log is not None:
+            self._log.write(line)
+
+    def _append_many(self, lines: List[str]) -> None:
+        if self._log is not None and lines:
+            self._log.write(''.join(lines))
+
+    def flush(self) -> None:
+        """Make logged mutations durable."""
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def checkpoint(self) -> None:
+        """Write a full snapshot and truncate the mutation log."""
+        if not self.path:
+            return
+        self.merge()
+        tmp = os.path.join(self.path, 'snapshot.tmp')
+        with open(tmp, 'wb') as f:
+            header = json.dumps({'names': self.names, 'edges': len(self.indices)}).encode()
+            f.write(len(header).to_bytes(8, 'little') + header)
+            for buf in (self.indptr, self.indices, self.weights, self.updated):
+                f.write(buf.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, 'snapshot.bin'))
+        self._log.close()
+        self._log = open(os.path.join(self.path, 'edges.log'), 'w')
+
+    def _load(self) -> None:
+        snap = os.path.join(self.path, 'snapshot.bin')
+        if os.path.exists(snap):
+            with open(snap, 'rb') as f:
+                size = int.from_bytes(f.read(8), 'little')
+                header = json.loads(f.read(size))
+                self.names, m = header['names'], header['edges']
+                n = len(self.names)
+                self.ids = {name: i for i, name in enumerate(self.names)}
+                self.indptr = array('q')
+                self.indptr.frombytes(f.read((n + 1) * 8))
+                for attr, code, size in (('indices', 'i', 4), ('weights', 'f', 4), ('updated', 'q', 8)):
+                    buf = array(code)
+                    buf.frombytes(f.read(m * size))
+                    setattr(self, attr, buf)
+        log = os.path.join(self.path, 'edges.log')
+        if os.path.exists(log):
+            with open(log) as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break  # torn final line
+                    op = line[:-1].split('\t')
+                    if op[0] == 'a':
+                        self._add(self._node(op[1]), self._node(op[2]), float(op[3]), int(op[4]))
+                    elif op[0] == 'd':
+                        if op[1] in self.ids:
+                            self._dead.add(self.ids[op[1]])
+                            self._delta.pop(self.ids[op[1]], None)
+                    elif op[0] == 'p':
+                        self.prune(float(op[1]))
+
+    def close(self) -> None:
+        if self._log is not None:
+            self.flush()
+            self._log.close()
+            self._log = None
@@ -0,0 +1,171 @@
+"""
+Incremental inverted index with BM25 scoring.
+
+Vector search is weak on exact identifiers (error codes, names, SKUs). This
+index keeps one postings list per term as a pair of flat arrays (document
+numbers and term frequencies) so exact tokens can be matched and scored
+alongside the sector vectors.
+"""
+
+import heapq
+import math
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Words plus joined identifiers such as "ERR-1042", "v2.1" or "sku_88-b"
+_TOKEN = re.compile(r'\w+(?:[-./:]\w+)*')
+_PART = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens. Joined identifiers are kept whole and also split into
+    their parts, so "ERR-1042" matches both "err-1042" and "1042".
+    """
+    out = []
+    for tok in _TOKEN.findall(text.lower()):
+        out.append(tok)
+        if not tok.isalnum():
+            out.extend(p for p in _PART.findall(tok) if p != tok)
+    return out
+
+
+class InvertedIndex:
+    """
+    BM25 index over memory content.
+
+    Args:
+        k1: Term frequency saturation
+        b: Length normalisation
+        compact_ratio: Share of deleted documents that triggers a postings rewrite
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.names: List[str] = []
+        self.docs: Dict[str, int] = {}
+        self.lengths = array('I')
+        # term -> (doc numbers, term frequencies), doc numbers ascending
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.dead: Set[int] = set()
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.docs
+
+    def add(self, id: str, text: str) -> None:
+        if id in self.docs:
+            self.remove(id)
+        tokens = tokenize(text)
+        n = len(self.names)
+        self.names.append(id)
+        self.docs[id] = n
+        self.lengths.append(len(tokens))
+        self.total_len += len(tokens)
+        tf: Dict[str, int] = {}
+        for t in tokens:
+            tf[t] = tf.get(t, 0) + 1
+        for t, c in tf.items():
+            post = self.postings.get(t)
+            if post is None:
+                post = self.postings[t] = (array('I'), array('H'))
+            post[0].append(n)
+            post[1].append(min(c, 65535))
+
+    def remove(self, id: str) -> bool:
+        n = self.docs.pop(id, None)
+        if n is None:
+            return False
+        self.dead.add(n)
+        self.total_len -= self.lengths[n]
+        if len(self.dead) > self.compact_ratio * len(self.names):
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Drop deleted documents from every postings list and renumber."""
+        remap = array('i', [-1]) * len(self.names)
+        names: List[str] = []
+        lengths = array('I')
+        for n, name in enumerate(self.names):
+            if n not in self.dead:
+                remap[n] = len(names)
+                names.append(name)
+                lengths.append(self.lengths[n])
+        postings = {}
+        for t, (docs, tfs) in self.postings.items():
+            nd, nt = array('I'), array('H')
+            for d, c in zip(docs, tfs):
+                if remap[d] >= 0:
+                    nd.append(remap[d])
+                    nt.append(c)
+            if nd:
+                postings[t] = (nd, nt)
+        self.names, self.lengths, self.postings = names, lengths, postings
+        self.docs = {name: n for n, name in enumerate(names)}
+        self.dead = set()
+
+    def idf(self, term: str) -> float:
+        post = self.postings.get(term)
+        if post is None:
+            return 0.0
+        df = len(post[0]) if not self.dead else sum(d not in self.dead for d in post[0])
+        n = len(self.docs)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10,
+               ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k documents by BM25.
+
+        Args:
+            query: Query text
+            k: Number of results
+            ids: Optional set of ids to restrict scoring to
+
+        Returns:
+            List of (id, score), best first
+        """
+        if not self.docs:
+            return []
+        allow = None if ids is None else {self.docs[i] for i in ids if i in self.docs}
+        avgdl = self.total_len / len(self.docs) or 1.0
+        k1, b = self.k1, self.b
+        lengths = self.lengths
+        dead = self.dead
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            post = self.postings.get(term)
+            if post is None:
+                continue
+            idf = self.idf(term)
+            for d, tf in zip(*post):
+                if d in dead or (allow is not None and d not in allow):
+                    continue
+                norm = k1 * (1 - b + b * lengths[d] / avgdl)
+                scores[d] = scores.get(d, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+        return [(self.names[d], s) for d, s in best]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'documents': len(self.docs),
+            'terms': len(self.postings),
+            'postings': sum(len(d) for d, _ in self.postings.values()),
+            'deleted': len(self.dead)
+        }
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], c: int = 60) -> Dict[str, float]:
+    """Sum of 1 / (c + rank) over every ranking an id appears in."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, 1):
+            fused[id] = fused.get(id, 0.0) + 1 / (c + rank)
+    return fused
@@ -0,0 +1,851 @@
+"""
+Embedded HSG memory engine.
+
+``LocalMemory`` runs the backend's hierarchical sector graph in-process with
+the same method names and response shapes as ``OpenMemory``. Memory rows live
+in SQLite (the backend's ``memories`` schema), sector vectors in per-sector
+``VectorStore`` files and waypoints in a ``WaypointGraph``. With a
+``durability`` mode set, mutations go through a ``WriteAheadLog`` and reach
+those files at background checkpoints. ``compact()`` reclaims the space of
+deleted memories while the engine keeps serving.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from array import array
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .embedding import Embedder
+from .bitmap import BitmapIndex
+from .compaction import CompactionJob
+from .decay import DecayCompactor, decayed_salience
+from .dedup import DedupStats, SimHashIndex, simhash
+from .graph import WaypointGraph
+from .lexical import InvertedIndex, reciprocal_rank_fusion
+from .sectors import SECTOR_CONFIGS, SECTOR_NAMES, SectorClassifier
+from .store import VectorStore
+from .timeline import TimeIndex
+from .wal import WriteAheadLog
+
+# Mirrors SCORING_WEIGHTS and REINFORCEMENT in backend/src/hsg
+SCORING_WEIGHTS = {'similarity': 0.6, 'salience': 0.2, 'recency': 0.1, 'waypoint': 0.1}
+SALIENCE_BOOST = 0.1
+MAX_SALIENCE = 1.0
+WAYPOINT_THRESHOLD = 0.75
+WAYPOINT_SCAN = 1000
+DAY_MS = 1000 * 60 * 60 * 24
+# Hybrid queries take k * LEXICAL_POOL BM25 candidates
+LEXICAL_POOL = 4
+RRF_C = 60
+
+SCHEMA = '''
+create table if not exists memories(
+    id text primary key,
+    content text not null,
+    primary_sector text not null,
+    tags text,
+    meta text,
+    created_at integer,
+    updated_at integer,
+    last_seen_at integer,
+    salience real,
+    decay_lambda real,
+    version integer default 1,
+    mean_dim integer,
+    mean_vec blob,
+    decay_ts integer
+)
+'''
+# Time the stored salience was last brought up to date; see decay.py
+DECAY_TS = 'coalesce(decay_ts, last_seen_at, updated_at)'
+# Size of every vector and graph file at the last checkpoint. With a WAL,
+# those files may run ahead of the log, so they are cut back to these sizes
+# on open and the log is replayed on top.
+CHECKPOINT_SCHEMA = 'create table if not exists checkpoint_files(file text primary key, size integer)'
+
+
+def _now() -> int:
+    return int(time.time() * 1000)
+
+
+def calculate_recency_score(last_seen_at: int, now: Optional[int] = None) -> float:
+    days = ((now or _now()) - last_seen_at) / DAY_MS
+    return math.exp(-days / 30)
+
+
+def compute_retrieval_score(similarity: float, salience: float, last_seen_at: int,
+                            waypoint_weight: float = 0.0, now: Optional[int] = None) -> float:
+    return (SCORING_WEIGHTS['similarity'] * similarity +
+            SCORING_WEIGHTS['salience'] * salience +
+            SCORING_WEIGHTS['recency'] * calculate_recency_score(last_seen_at, now) +
+            SCORING_WEIGHTS['waypoint'] * waypoint_weight)
+
+
+def chunk_text(text: str, target_tokens: int = 768, overlap_ratio: float = 0.1) -> List[str]:
+    """Sentence-aware chunking with overlap (utils/chunking.ts)."""
+    if math.ceil(len(text) / 4) <= target_tokens:
+        return [text]
+    target_chars = target_tokens * 4
+    overlap_chars = int(target_chars * overlap_ratio)
+    chunks = []
+    cur = ''
+    for para in re.split(r'\n\n+', text):
+        for sentence in re.split(r'(?<=[.!?])\s+', para):
+            nxt = cur + (' ' if cur else '') + sentence
+            if len(nxt) > target_chars and cur:
+                chunks.append(cur)
+                cur = cur[-overlap_chars:] + ' ' + sentence
+            else:
+                cur = nxt
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def _weighted_mean(results: List[Dict]) -> array:
+    """Sector-weighted mean of the sector vectors (calculateMeanVector)."""
+    dim = len(results[0]['vector'])
+    acc = [0.0] * dim
+    total = 0.0
+    for r in results:
+        w = SECTOR_CONFIGS.get(r['sector'], {}).get('weight', 1.0)
+        total += w
+        vec = r['vector']
+        for i in range(dim):
+            acc[i] += vec[i] * w
+    return array('f', [x / total for x in acc])
+
+
+class _SyncedLock:
+    """
+    The engine lock, entered only once every logged write is durable.
+    Taken by whatever makes file state permanent (checkpoints, compaction
+    swaps), so no unlogged write can outlive a crash.
+    """
+
+    def __init__(self, engine: 'LocalMemory'):
+        self.engine = engine
+
+    def __enter__(self) -> None:
+        self.engine._lock.acquire()
+        wal = self.engine.wal
+        if wal is not None:
+            wal.sync(wal.seq)
+
+    def __exit__(self, *exc) -> None:
+        self.engine._lock.release()
+
+
+class LocalMemory:
+    """
+    In-process memory engine with the ``OpenMemory`` client API.
+
+    Args:
+        path: Data directory (None keeps everything in memory)
+        dim: Embedding dimension
+        embedder: ``Embedder`` or ``MicroBatcher``; defaults to the synthetic provider
+        quantization: None for exact sector search, 'int8' or 'pq' to score
+            on compressed codes and re-rank the shortlist from the mmap store.
+            'int8' is a RAM saving, not a speed-up (see ``VectorStore``)
+        rerank: Re-ranked shortlist size as a multiple of k
+        train_size: Vectors per sector collected before PQ training
+        pq_options: Extra ``PQCodes`` arguments (dsub, ks, iters)
+        metadata_keys: Metadata keys usable in query filters (None indexes
+            every top-level key)
+        decay_interval: Seconds between background decay compactions (None
+            disables the thread; ``run_decay`` still works)
+        decay_budget_ms: Time budget of one compaction run
+        decay_batch: Rows per compaction batch
+        durability: None commits SQLite on every write; 'batch', 'interval'
+            or 'none' log writes to a group-committed WAL instead (see
+            ``WriteAheadLog``) and checkpoint in the background. A log left
+            by an earlier run is replayed on open whatever this is set to
+        sync_interval: WAL background tick in seconds ('interval' fsyncs)
+        checkpoint_bytes: WAL size that triggers a checkpoint
+        checkpoint_interval: Seconds after which a non-empty WAL is checkpointed
+        dedup: Reinforce near-duplicates of stored memories instead of
+            inserting them (SimHash with LSH buckets; see ``SimHashIndex``)
+        dedup_distance: Largest SimHash Hamming distance treated as a
+            duplicate. The default catches case and punctuation changes,
+            not one-word edits of short texts (see ``SimHashIndex``)
+    """
+
+    def __init__(self, path: Optional[str] = None, dim: int = 768, embedder=None,
+                 quantization: Optional[str] = None, rerank: int = 10,
+                 train_size: int = 1024, pq_options: Optional[Dict] = None,
+                 metadata_keys: Optional[List[str]] = None,
+                 decay_interval: Optional[float] = 60.0, decay_budget_ms: float = 10.0,
+                 decay_batch: int = 512, durability: Optional[str] = None,
+                 sync_interval: float = 1.0, checkpoint_bytes: int = 16 << 20,
+                 checkpoint_interval: float = 60.0, dedup: bool = False,
+                 dedup_distance: int = 4):
+        self.path = path
+        self.dim = dim
+        self.embedder = embedder or Embedder('synthetic', dim)
+        self.classifier = SectorClassifier()
+        self._lock = threading.RLock()
+        self._synced = _SyncedLock(self)
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(path, 'memories.sqlite') if path else ':memory:',
+                                  check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute(SCHEMA)
+        self.db.execute(CHECKPOINT_SCHEMA)
+        if 'decay_ts' not in [c['name'] for c in self.db.execute('pragma table_info(memories)')]:
+            self.db.execute('alter table memories add column decay_ts integer')
+        self.db.commit()
+        self.db.create_function('om_decay', 4, decayed_salience)
+        wal_path = os.path.join(path, 'wal.log') if path else None
+        if path:
+            # A no-op unless an earlier run used a WAL (see checkpoint)
+            self._rollback()
+        vec_dir = os.path.join(path, 'vectors') if path else None
+        self.stores = {
+            s: VectorStore(vec_dir, s, dim, quantization, rerank, train_size, pq_options)
+            for s in SECTOR_NAMES
+        }
+        # Mean vectors are only scanned for waypoint creation; kept exact
+        self.means = VectorStore(vec_dir, 'mean', dim)
+        self.graph = WaypointGraph(os.path.join(path, 'graph') if path else None)
+        self.wal = None
+        if durability and not path:
+            raise ValueError('durability requires a path')
+        if durability or (path and os.path.exists(wal_path) and os.path.getsize(wal_path)):
+            # A log left by an earlier run is recovered even when this one
+            # runs without it. Replayed before the derived indexes are built
+            # from the rows.
+            self.wal = WriteAheadLog(wal_path, durability or 'batch', sync_interval,
+                                     checkpoint_bytes, checkpoint_interval)
+            for rec in self.wal.replay():
+                self._apply(rec, index=False)
+            self.checkpoint()
+            if not durability:
+                self.wal.close()
+                self.wal = None
+        if path and self.wal is None:
+            # Files now grow without checkpoints, so the recorded sizes are stale
+            self.db.execute('delete from checkpoint_files')
+            self.db.commit()
+        # Lexical, filter and time indexes are derived from the rows, so they are rebuilt on open
+        self.lexical = InvertedIndex()
+        self.fields = BitmapIndex(metadata_keys)
+        self.dedup = SimHashIndex(dedup_distance) if dedup else None
+        self.dedup_stats = DedupStats()
+        stores = self._vector_stores()
+        row_times = {name: array('q', bytes(8 * len(st.ids))) for name, st in stores.items()}
+        self._last_ts = 0
+        for row in self.db.execute('select id, content, tags, meta, created_at from memories order by created_at'):
+            mid = row['id']
+            self.lexical.add(mid, row['content'])
+            self.fields.add(mid, json.loads(row['tags'] or '[]'), json.loads(row['meta'] or '{}'))
+            fp = simhash(row['content']) if self.dedup is not None else None
+            if fp is not None:
+                self.dedup.add(mid, fp)
+            for name, st in stores.items():
+                r = st.rows.get(mid)
+                if r is not None:
+                    row_times[name][r] = row['created_at']
+            self._last_ts = row['created_at']
+        # Store rows are in creation order, so per-row times are sorted
+        self.timelines = {name: TimeIndex.rebuild(t) for name, t in row_times.items()}
+        self.decay = DecayCompactor(self, decay_batch, decay_budget_ms, decay_interval)
+        self._compaction: Optional[CompactionJob] = None
+        if self.wal is not None:
+            self.wal.start(self.checkpoint)
+
+    # -- writes -------------------------------------------------------------
+
+    def add(self, content: str, tags: Optional[List[str]] = None,
+            metadata: Optional[Dict[str, Any]] = None, salience: float = 0.5,
+            decay_lambda: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Add a memory (addHSGMemory).
+
+        Like the server, the initial salience and decay rate come from the
+        classification; ``salience`` and ``decay_lambda`` are accepted for
+        client compatibility. With ``dedup`` enabled, a near-duplicate of a
+        stored memory reinforces it instead and is returned with
+        ``deduplicated: True``.
+        """
+        result, seq = self._add(content, tags, metadata)
+        self._sync(seq)
+        return result
+
+    def add_many(self, items: List[Union[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Add several memories, sharing one WAL sync.
+
+        Args:
+            items: Contents, or dicts of ``add`` arguments
+
+        Returns:
+            One ``add`` result per item, in order
+        """
+        results = []
+        seq = 0
+        for item in items:
+            item = {'content': item} if isinstance(item, str) else item
+            result, s = self._add(item['content'], item.get('tags'), item.get('metadata'))
+            results.append(result)
+            seq = max(seq, s)
+        self._sync(seq)
+        return results
+
+    def _add(self, content: str, tags: Optional[List[str]], metadata: Optional[Dict[str, Any]],
+             memory_id: Optional[str] = None) -> Tuple[Dict[str, Any], int]:
+        if not content:
+            raise ValueError('content is required')
+        fp = None
+        if self.dedup is not None:
+            # Checked before embedding, which is the expensive part of an add
+            start = time.perf_counter()
+            fp = simhash(content)
+            if fp is not None:
+                with self._lock:
+                    hit = self.dedup.find(fp)
+                    self.dedup_stats.record(start, hit is not None)
+                    done = self._reinforce_duplicate(hit[0]) if hit else None
+                if done:
+                    return done
+        chunks = chunk_text(content)
+        cls = self.classifier.classify(content, metadata)
+        sectors = [cls['primary']] + cls['additional']
+        results = self.embedder.embed_multi_sector(content, sectors, chunks if len(chunks) > 1 else None)
+        mean = _weighted_mean(results)
+        mid = memory_id or str(uuid.uuid4())
+        rec = {
+            'op': 'add', 'id': mid, 'content': content, 'primary_sector': cls['primary'],
+            'tags': tags or [], 'meta': metadata or {},
+            'salience': max(0.0, min(1.0, 0.4 + 0.1 * len(cls['additional']))),
+            'decay_lambda': SECTOR_CONFIGS[cls['primary']]['decay_lambda'],
+            'vectors': {r['sector']: r['vector'] for r in results}, 'mean': mean
+        }
+        with self._lock:
+            if fp is not None:
+                # A concurrent add of the same text may have landed meanwhile
+                start = time.perf_counter()
+                hit = self.dedup.find(fp)
+                self.dedup_stats.record(start, hit is not None, recheck=True)
+                done = self._reinforce_duplicate(hit[0]) if hit else None
+                if done:
+                    return done
+            # Taken under the lock and never moving backwards, so store rows
+            # stay in created_at order
+            rec['ts'] = self._last_ts = max(_now(), self._last_ts)
+            # createSingleWaypoint: best match among the most recent memories
+            best = self.means.search(mean, 1, self._tail(self.means, WAYPOINT_SCAN))
+            rec['waypoint'] = list(best[0]) if best and best[0][1] >= WAYPOINT_THRESHOLD else None
+            self._apply(rec)
+            seq = self._commit(rec)
+            # Indexed only once the add went through, so a failed add leaves no id behind
+            if fp is not None:
+                self.dedup.add(mid, fp)
+        return {'id': mid, 'primary_sector': cls['primary'], 'sectors': sectors, 'chunks': len(chunks)}, seq
+
+    def _reinforce_duplicate(self, memory_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Reinforce the matched memory; None (and the id unindexed) if it has no row. Call under the lock."""
+        row = self.db.execute('select * from memories where id=?', (memory_id,)).fetchone()
+        if row is None:
+            if self.dedup is not None:
+                self.dedup.remove(memory_id)
+            return None
+        seq = self._reinforce(row, SALIENCE_BOOST)
+        return {'id': memory_id, 'primary_sector': row['primary_sector'], 'sectors': self._sectors_of(memory_id),
+                'chunks': 0, 'deduplicated': True}, seq
+
+    @staticmethod
+    def _tail(store: VectorStore, n: int) -> List[int]:
+        """Up to ``n`` live rows of ``store``, newest first."""
+        rows = []
+        r = len(store.ids) - 1
+        while r >= 0 and len(rows) < n:
+            if r not in store.dead:
+                rows.append(r)
+            r -= 1
+        return rows
+
+    def reinforce(self, memory_id: str, boost: float = SALIENCE_BOOST) -> Dict[str, bool]:
+        """Boost a memory's salience and mark it seen (reinforceMemory)."""
+        with self._lock:
+            row = self.db.execute('select * from memories where id=?', (memory_id,)).fetchone()
+            if row is None:
+                raise KeyError(f'Memory {memory_id} not found')
+            seq = self._reinforce(row, boost)
+        self._sync(seq)
+        return {'ok': True}
+
+    def _reinforce(self, row: sqlite3.Row, boost: float) -> int:
+        now = _now()
+        rec = {'op': 'touch', 'ts': now, 'ids': [row['id']],
+               'salience': [min(MAX_SALIENCE, self._current(row, now) + boost)]}
+        self._apply(rec)
+        return self._commit(rec)
+
+    def delete(self, memory_id: str) -> Dict[str, bool]:
+        """Delete a memory, its sector vectors and its waypoints."""
+        with self._lock:
+            rec = {'op': 'delete', 'id': memory_id}
+            if not self._apply(rec):
+                raise KeyError(f'Memory {memory_id} not found')
+            seq = self._commit(rec)
+        self._sync(seq)
+        return {'ok': True}
+
+    def _apply(self, rec: Dict[str, Any], index: bool = True) -> bool:
+        """
+        Apply one logged mutation. Replay passes ``index=False`` because the
+        derived indexes are rebuilt from the rows afterwards; every record is
+        idempotent so a replayed one may already be partly on disk.
+        """
+        op = rec['op']
+        if op == 'add':
+            mid, now, mean = rec['id'], rec['ts'], rec['mean']
+            self.db.execute(
+                'insert or replace into memories(id,content,primary_sector,tags,meta,created_at,updated_at,'
+                'last_seen_at,salience,decay_lambda,version,mean_dim,mean_vec,decay_ts) '
+                'values(?,?,?,?,?,?,?,?,?,?,?,?,?,?)',
+                (mid, rec['content'], rec['primary_sector'], json.dumps(rec['tags']), json.dumps(rec['meta']),
+                 now, now, now, rec['salience'], rec['decay_lambda'], 1, len(mean), None, now))
+            for sector, vec in rec['vectors'].items():
+                if mid not in self.stores[sector]:
+                    self.stores[sector].add(mid, vec)
+                    if index:
+                        self.timelines[sector].append(now)
+            if rec['waypoint']:
+                self.graph.add_edge(mid, rec['waypoint'][0], rec['waypoint'][1], now)
+            if mid not in self.means:
+                self.means.add(mid, mean)
+                if index:
+                    self.timelines['mean'].append(now)
+            if index:
+                self.lexical.add(mid, rec['content'])
+                self.fields.add(mid, rec['tags'], rec['meta'])
+            return True
+        if op == 'touch':
+            now = rec['ts']
+            self.db.executemany('update memories set last_seen_at=?, salience=?, updated_at=?, decay_ts=? '
+                                'where id=?', [(now, s, now, now, mid) for mid, s in zip(rec['ids'], rec['salience'])])
+            if rec.get('edges'):
+                self.graph.add_edges(rec['edges'], now)
+            return True
+        if op == 'delete':
+            mid = rec['id']
+            cur = self.db.execute('delete from memories where id=?', (mid,))
+            for store in self.stores.values():
+                store.delete(mid)
+            self.means.delete(mid)
+            if index:
+                self.lexical.remove(mid)
+                self.fields.remove(mid)
+                if self.dedup is not None:
+                    self.dedup.remove(mid)
+            self.graph.remove_node(mid)
+            return cur.rowcount > 0
+        raise ValueError(f'unknown log record: {op}')
+
+    def _commit(self, rec: Dict[str, Any]) -> int:
+        """Log ``rec`` (or commit SQLite without a WAL); call under the lock."""
+        if self.wal is None:
+            self.db.commit()
+            return 0
+        return self.wal.append(rec)
+
+    def _sync(self, seq: int) -> None:
+        # Outside the lock, so concurrent writers share one group commit
+        if seq:
+            self.wal.sync(seq)
+
+    # -- reads --------------------------------------------------------------
+
+    def query(self, query: str, k: int = 8,
+              filters: Optional[Dict[str, Any]] = None, mode: str = 'vector',
+              fusion: str = 'weighted', alpha: float = 0.5, prune: bool = True,
+              since: Optional[int] = None, until: Optional[int] = None,
+              reinforce: bool = True) -> Dict[str, Any]:
+        """
+        Query memories (hsgQuery): per-sector vector search, waypoint
+        expansion, then salience/recency/waypoint weighted scoring. The
+        returned memories are reinforced.
+
+        Args:
+            query: Search query text
+            k: Number of results to return
+            filters: Optional filters:
+                - sector: Only search this sector
+                - min_score: Minimum salience
+                - tags: Memories must carry every listed tag
+                - metadata: {key: value} equality; a list value matches any element
+            mode: 'vector', or 'hybrid' to also match query terms with BM25
+            fusion: Hybrid only: 'weighted' (similarity and max-normalised
+                BM25 blended by ``alpha``) or 'rrf' (reciprocal rank, which
+                keeps only the order of each list)
+            alpha: Vector share of the 'weighted' fusion
+            prune: Hybrid only: when BM25 finds at least k candidates, only
+                their vectors are scored
+            since: Only memories created at or after this time (ms)
+            until: Only memories created at or before this time (ms)
+            reinforce: False leaves the matches untouched, for callers that
+                merge several result lists and reinforce only the winners
+
+        Returns:
+            Dict with query and matches, shaped like the server response
+        """
+        if mode not in ('vector', 'hybrid'):
+            raise ValueError(f'unknown mode: {mode}')
+        filters = filters or {}
+        cls = self.classifier.classify(query)
+        candidates = [cls['primary']] + cls['additional']
+        if filters.get('sector'):
+            candidates = [s for s in candidates if s == filters['sector']]
+        sectors = candidates or ['semantic']
+        qvecs = {s: self.embedder.embed(query, s) for s in sectors}
+        with self._lock:
+            allowed = None
+            pool = None
+            if filters.get('tags') or filters.get('metadata'):
+                # Bitmap intersection first; only the survivors are scored
+                pool = self.fields.ids(self.fields.match(filters.get('tags'), filters.get('metadata')))
+                allowed = set(pool)
+            lexical: List = []
+            if mode == 'hybrid':
+                scope = allowed
+                if filters.get('sector'):
+                    scope = set().union(*(self.stores[s].rows for s in sectors))
+                    scope = scope if allowed is None else scope & allowed
+                lexical = self.lexical.search(query, k * LEXICAL_POOL, scope)
+                if prune and len(lexical) >= k:
+                    pool = [mid for mid, _ in lexical]
+            window = None if since is None and until is None else (since, until)
+            hits = {s: self._search(s, qvecs[s], k, pool, window) for s in sectors}
+            sims: Dict[str, float] = {}
+            for res in hits.values():
+                for mid, sim in res:
+                    sims[mid] = max(sims.get(mid, 0.0), sim)
+            seeds = list(sims)
+            if mode == 'hybrid':
+                seeds += [mid for mid, _ in lexical[:k] if mid not in sims]
+                sims = self._fuse(sims, lexical, fusion, alpha)
+            expanded: Dict[str, Dict] = {}
+            for e in self.graph.expand(seeds, k * 2):
+                expanded.setdefault(e['id'], e)
+            min_salience = filters.get('min_score')
+            now = _now()
+            matches = []
+            for mid in expanded:
+                if allowed is not None and mid not in allowed:
+                    continue
+                mem = self.db.execute('select * from memories where id=?', (mid,)).fetchone()
+                if mem is None:
+                    continue
+                if window and not ((since is None or mem['created_at'] >= since) and
+                                   (until is None or mem['created_at'] <= until)):
+                    continue
+                current = self._current(mem, now)
+                if min_salience and current < min_salience:
+                    continue
+                exp = expanded[mid]
+                matches.append({
+                    'id': mid,
+                    'content': mem['content'],
+                    'score': compute_retrieval_score(sims.get(mid, 0.0), current, mem['last_seen_at'],
+                                                     exp['weight'], now),
+                    'sectors': self._sectors_of(mid),
+                    'primary_sector': mem['primary_sector'],
+                    'path': exp['path'],
+                    'salience': current,
+                    'last_seen_at': mem['last_seen_at']
+                })
+            matches.sort(key=lambda m: m['score'], reverse=True)
+            top = matches[:k]
+        if reinforce:
+            self.reinforce_matches(top)
+        return {'query': query, 'matches': top}
+
+    def reinforce_matches(self, matches: List[Dict[str, Any]]) -> None:
+        """Reinforce query matches and the waypoint paths that reached them."""
+        if not matches:
+            return
+        with self._lock:
+            now = _now()
+            rec = {'op': 'touch', 'ts': now, 'ids': [m['id'] for m in matches],
+                   'salience': [min(MAX_SALIENCE, m['salience'] + SALIENCE_BOOST) for m in matches],
+                   # Logged as new weights, so a replay does not boost twice
+                   'edges': self.graph.boosted([m['path'] for m in matches if len(m['path']) > 1])}
+            self._apply(rec)
+            seq = self._commit(rec)
+        self._sync(seq)
+
+    def _search(self, sector: str, vec: array, k: int, ids: Optional[List[str]] = None,
+                window: Optional[Tuple[Optional[int], Optional[int]]] = None) -> List:
+        store = self.stores[sector]
+        span = None if window is None else self.timelines[sector].rows(*window)
+        if ids is None:
+            rows = span
+        else:
+            rows = [store.rows[i] for i in ids if i in store.rows]
+            if span is not None:
+                rows = [r for r in rows if r in span]
+        return store.search(vec, k, rows)
+
+    @staticmethod
+    def _fuse(sims: Dict[str, float], lexical: List, fusion: str, alpha: float) -> Dict[str, float]:
+        """Combine vector similarities with BM25 hits into one 0..1 relevance."""
+        if fusion == 'rrf':
+            ranked = sorted(sims, key=sims.get, reverse=True)
+            fused = reciprocal_rank_fusion([ranked, [mid for mid, _ in lexical]], RRF_C)
+            # Ranked first by both lists scores 1.0, like a perfect similarity
+            return {mid: f * (RRF_C + 1) / 2 for mid, f in fused.items()}
+        if fusion == 'weighted':
+            top = lexical[0][1] if lexical else 1.0
+            fused = {mid: alpha * sim for mid, sim in sims.items()}
+            for mid, score in lexical:
+                fused[mid] = fused.get(mid, 0.0) + (1 - alpha) * score / top
+            return fused
+        raise ValueError(f'unknown fusion: {fusion}')
+
+    def query_sector(self, query: str, sector: str, k: int = 8) -> Dict[str, Any]:
+        return self.query(query, k, {'sector': sector})
+
+    def _sectors_of(self, memory_id: str) -> List[str]:
+        return [s for s, store in self.stores.items() if memory_id in store]
+
+    @staticmethod
+    def _current(row: sqlite3.Row, now: int) -> float:
+        """Salience decayed lazily up to ``now``."""
+        since = row['decay_ts'] or row['last_seen_at'] or row['updated_at']
+        return decayed_salience(row['salience'], row['decay_lambda'], since, now)
+
+    def _item(self, row: sqlite3.Row, now: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'content': row['content'],
+            'tags': json.loads(row['tags']) if row['tags'] else [],
+            'metadata': json.loads(row['meta']) if row['meta'] else {},
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'last_seen_at': row['last_seen_at'],
+            'salience': self._current(row, now or _now()),
+            'decay_lambda': row['decay_lambda'],
+            'primary_sector': row['primary_sector'],
+            'version': row['version']
+        }
+
+    def get(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        """One memory with its sectors (GET /memory/:id), or None."""
+        with self._lock:
+            row = self.db.execute('select * from memories where id=?', (memory_id,)).fetchone()
+            if row is None:
+                return None
+            item = self._item(row)
+            item['sectors'] = self._sectors_of(memory_id)
+        return item
+
+    def all(self, limit: int = 100, offset: int = 0, sector: Optional[str] = None) -> Dict[str, List]:
+        """Memories, newest first, optionally restricted to one primary sector."""
+        with self._lock:
+            if sector:
+                rows = self.db.execute('select * from memories where primary_sector=? '
+                                       'order by created_at desc limit ? offset ?', (sector, limit, offset))
+            else:
+                rows = self.db.execute('select * from memories order by created_at desc limit ? offset ?',
+                                       (limit, offset))
+            return {'items': [self._item(r) for r in rows.fetchall()]}
+
+    def get_by_sector(self, sector: str, limit: int = 100, offset: int = 0) -> Dict[str, List]:
+        return self.all(limit, offset, sector)
+
+    def recent(self, n: int = 10, sector: Optional[str] = None) -> Dict[str, List]:
+        """
+        The ``n`` newest memories, read from the tail of the time-ordered
+        store rows instead of sorting the table.
+
+        Args:
+            n: Number of memories
+            sector: Only memories with a vector in this sector
+        """
+        with self._lock:
+            store = self.stores[sector] if sector else self.means
+            ids = [store.ids[r] for r in self._tail(store, n)]
+            if not ids:
+                return {'items': []}
+            rows = self.db.execute(f"select * from memories where id in ({','.join('?' * len(ids))})", ids)
+            by_id = {r['id']: self._item(r) for r in rows.fetchall()}
+        return {'items': [by_id[i] for i in ids if i in by_id]}
+
+    def sectors(self) -> Dict[str, Any]:
+        """Sector names, configs and per-sector counts (GET /sectors)."""
+        with self._lock:
+            rows = self.db.execute('select primary_sector as sector, count(*) as count, '
+                                   f'avg(om_decay(salience, decay_lambda, {DECAY_TS}, ?)) as avg_salience '
+                                   'from memories group by primary_sector', (_now(),))
+            stats = [dict(r) for r in rows.fetchall()]
+        configs = {s: {k: v for k, v in cfg.items() if k != 'patterns'} for s, cfg in SECTOR_CONFIGS.items()}
+        return {'sectors': list(SECTOR_CONFIGS), 'configs': configs, 'stats': stats}
+
+    get_sectors = sectors
+
+    def health(self) -> Dict[str, Any]:
+        embedder = getattr(self.embedder, 'embedder', self.embedder)
+        return {
+            'ok': True,
+            'version': '2.0-hsg',
+            'embedding': {'provider': embedder.provider, 'dimensions': self.dim,
+                          'batch_support': embedder is not self.embedder}
+        }
+
+    get_health = health
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-sector vector store sizes (with compressed code bytes), plus WAL, dedup and compaction counters."""
+        with self._lock:
+            stats = {s: store.stats() for s, store in self.stores.items()}
+        if self.wal is not None:
+            stats['wal'] = self.wal.stats()
+        if self.dedup is not None:
+            stats['dedup'] = dict(self.dedup_stats.stats(), **self.dedup.stats())
+        if self._compaction is not None:
+            stats['compaction'] = self._compaction.progress()
+        return stats
+
+    def flush(self) -> None:
+        if self.wal is not None:
+            self.checkpoint()
+            return
+        with self._lock:
+            for store in self.stores.values():
+                store.flush()
+            self.means.flush()
+            self.graph.flush()
+            self.db.commit()
+
+    def checkpoint(self) -> Dict[str, float]:
+        """
+        Make every write durable in SQLite and the vector files, snapshot the
+        graph (truncating ``edges.log``), then truncate the WAL. Runs in the
+        background by itself when a WAL is in use.
+        """
+        start = time.perf_counter()
+        with self._synced:
+            for store in self._vector_stores().values():
+                store.flush(sync=True)
+            self.graph.checkpoint()
+            if self.wal is not None:
+                # Committed with the rows, so the files and SQLite agree
+                files = [os.path.join('vectors', f'{name}.{ext}')
+                         for name in self._vector_stores() for ext in ('f32', 'ids', 'dead', 'codes')]
+                files.append(os.path.join('graph', 'edges.log'))
+                self.db.executemany('insert or replace into checkpoint_files(file, size) values(?, ?)',
+                                    [(f, os.path.getsize(os.path.join(self.path, f))) for f in files])
+            self.db.commit()
+            if self.wal is not None:
+                self.wal.truncate()
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.wal is not None:
+            self.wal.checkpointed(elapsed)
+        return {'elapsed_ms': elapsed}
+
+    def _rollback(self) -> None:
+        """Cut vector and graph files back to their sizes at the last checkpoint."""
+        for file, size in self.db.execute('select file, size from checkpoint_files').fetchall():
+            full = os.path.join(self.path, file)
+            if os.path.exists(full) and os.path.getsize(full) > size:
+                with open(full, 'r+b') as f:
+                    f.truncate(size)
+
+    # -- decay --------------------------------------------------------------
+
+    def _decay_batch(self, after: int, limit: int, min_age_ms: int) -> Tuple[Optional[int], int, int]:
+        """
+        Persist decayed salience for up to ``limit`` rows after rowid ``after``
+        in one UPDATE. Returns (last rowid or None at the end, rows seen, rows written).
+        """
+        with self._lock:
+            n, last = self.db.execute('select count(*), max(rowid) from (select rowid from memories '
+                                      'where rowid > ? order by rowid limit ?)', (after, limit)).fetchone()
+            if not n:
+                return None, 0, 0
+            now = _now()
+            cur = self.db.execute(
+                f'update memories set salience = om_decay(salience, decay_lambda, {DECAY_TS}, ?), '
+                f'decay_ts = ? where rowid > ? and rowid <= ? and {DECAY_TS} <= ?',
+                (now, now, after, last, now - min_age_ms))
+            if self.wal is None:
+                # With a WAL, SQLite is only committed at checkpoints
+                self.db.commit()
+            return last, n, cur.rowcount
+
+    def run_decay(self, budget_ms: Optional[float] = None) -> Dict[str, float]:
+        """
+        Run one compaction step now (the bounded counterpart of runDecayProcess).
+
+        Args:
+            budget_ms: Time budget; defaults to the engine's ``decay_budget_ms``
+        """
+        return self.decay.run_once(budget_ms)
+
+    # -- compaction ---------------------------------------------------------
+
+    def compact(self, background: bool = False, min_dead_ratio: float = 0.0,
+                retrain: bool = False) -> Union[Dict[str, Any], CompactionJob]:
+        """
+        Rewrite the vector stores without deleted rows and renumber the
+        graph, lexical and filter indexes; queries and writes keep running.
+
+        Args:
+            background: Run on a thread and return the ``CompactionJob``,
+                whose ``progress()`` also shows up in ``stats()``
+            min_dead_ratio: Skip stores with a smaller share of dead rows
+            retrain: Retrain PQ codebooks on the remaining rows
+
+        Returns:
+            The job's final progress, or the running job when ``background``
+        """
+        with self._lock:
+            if self._compaction is not None and self._compaction.state in ('pending', 'running'):
+                raise RuntimeError('a compaction is already running')
+            job = self._compaction = CompactionJob(self, min_dead_ratio, retrain)
+        if background:
+            return job.start()
+        return job.run()
+
+    def _vector_stores(self) -> Dict[str, VectorStore]:
+        return dict(self.stores, mean=self.means)
+
+    def _remap_rows(self, name: str, keep: List[int]) -> None:
+        # Called under the lock when a compacted store is swapped in
+        times = self.timelines[name].times
+        self.timelines[name] = TimeIndex.rebuild(array('q', map(times.__getitem__, keep)))
+        if self.wal is not None:
+            # The old checkpoint sizes do not describe the rewritten files
+            self.checkpoint()
+
+    def _compact_indexes(self) -> Dict[str, float]:
+        with self._synced:
+            start = time.perf_counter()
+            nodes = self.graph.compact()
+            self.lexical.compact()
+            self.fields.compact()
+            return {'graph_nodes_dropped': nodes, 'elapsed_ms': (time.perf_counter() - start) * 1000}
+
+    def close(self) -> None:
+        if self._compaction is not None:
+            self._compaction.wait()
+        # Stop the background threads first: their runs take the engine lock
+        self.decay.close()
+        if self.wal is not None:
+            self.wal.stop()
+            self.checkpoint()
+            self.wal.close()
+        with self._lock:
+            for store in self.stores.values():
+                store.close()
+            self.means.close()
+            self.graph.close()
+            self.db.close()
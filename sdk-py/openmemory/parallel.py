@@ -0,0 +1,265 @@
+"""
+Parallel helpers for bulk OpenMemory workloads.
+
+``map_add`` backfills memories and ``map_query`` runs query batches through a
+pool of workers. Each worker owns a keep-alive client, so the number of open
+sockets is bounded by ``workers`` and the number of queued items is bounded by
+``max_pending`` no matter how large the input iterable is. Worker clients are
+closed when the map call ends, releasing their sockets and health threads.
+
+Example:
+    for res in map_add(read_lines('history.txt'), workers=16, rate=200,
+                       checkpoint='backfill.ckpt'):
+        if not res['ok']:
+            print(res['index'], res['error'])
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from multiprocessing import util as mp_util
+from concurrent.futures import (
+    FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from .client import OpenMemory
+
+Item = Union[str, Dict[str, Any]]
+
+
+class RateLimiter:
+    """Token bucket shared by every submission of one map call."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_s = (1 - self.tokens) / self.rate
+            time.sleep(wait_s)
+
+
+class Checkpoint:
+    """
+    Resumable record of finished item indices.
+
+    Stored as a low-water mark (every index below it has been attempted), the
+    sparse set of successes above it, and the failures, which are retried on
+    the next run. The sparse set stays small because in-flight work is bounded.
+    """
+
+    def __init__(self, path: str, every: int = 1000):
+        self.path = path
+        self.every = every
+        self.low = 0
+        self.done: Set[int] = set()
+        self.failed: Set[int] = set()
+        self._since = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.low = state.get('low', 0)
+            self.done = set(state.get('done', []))
+            self.failed = set(state.get('failed', []))
+
+    def finished(self, i: int) -> bool:
+        if i < self.low:
+            return i not in self.failed
+        return i in self.done
+
+    def mark(self, i: int, ok: bool = True) -> None:
+        if ok:
+            self.done.add(i)
+            self.failed.discard(i)
+        else:
+            self.failed.add(i)
+        while self.low in self.done or self.low in self.failed:
+            self.done.discard(self.low)
+            self.low += 1
+        self._since += 1
+        if self._since >= self.every:
+            self.save()
+
+    def save(self) -> None:
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'low': self.low, 'done': sorted(self.done),
+                       'failed': sorted(self.failed)}, f)
+        os.replace(tmp, self.path)
+        self._since = 0
+
+
+# Worker processes get a module-level client from the pool initializer. Thread
+# workers keep theirs in a threading.local owned by the map call instead.
+_proc_client: Optional[OpenMemory] = None
+
+
+def _make_client(options: Dict[str, Any]) -> OpenMemory:
+    options = dict(options)
+    options.setdefault('keep_alive', True)
+    return OpenMemory(**options)
+
+
+def _init_process(options: Dict[str, Any]) -> None:
+    global _proc_client
+    _proc_client = _make_client(options)
+    # Pool workers leave through os._exit, which skips atexit; multiprocessing
+    # finalizers still run when the worker shuts down.
+    mp_util.Finalize(None, _proc_client.close, exitpriority=10)
+
+
+def _call(client: OpenMemory, op: str, item: Item) -> Dict[str, Any]:
+    if op == 'add':
+        if isinstance(item, str):
+            return client.add(item)
+        return client.add(**item)
+    if isinstance(item, str):
+        return client.query(item)
+    return client.query(**item)
+
+
+def _run_process(op: str, item: Item) -> Dict[str, Any]:
+    return _call(_proc_client, op, item)
+
+
+def _map(op: str, items: Iterable[Item], workers: int, executor: str, ordered: bool,
+         rate: Optional[float], checkpoint: Optional[str], max_pending: Optional[int],
+         client_options: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    if executor not in ('thread', 'process'):
+        raise ValueError(f'unknown executor: {executor}')
+    limiter = RateLimiter(rate) if rate else None
+    ckpt = Checkpoint(checkpoint) if checkpoint else None
+    max_pending = max_pending or workers * 4
+
+    pool: Executor
+    clients: List[OpenMemory] = []
+    if executor == 'process':
+        pool = ProcessPoolExecutor(workers, initializer=_init_process,
+                                   initargs=(client_options,))
+        submit: Callable[[Item], Future] = lambda item: pool.submit(_run_process, op, item)
+    else:
+        pool = ThreadPoolExecutor(workers, thread_name_prefix='openmemory')
+        local = threading.local()
+        clients_lock = threading.Lock()
+
+        def run_thread(item: Item) -> Dict[str, Any]:
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = _make_client(client_options)
+                with clients_lock:
+                    clients.append(client)
+            return _call(client, op, item)
+
+        submit = lambda item: pool.submit(run_thread, item)
+
+    def collect(i: int, fut: Future) -> Dict[str, Any]:
+        try:
+            res = {'index': i, 'ok': True, 'result': fut.result()}
+        except Exception as e:
+            res = {'index': i, 'ok': False, 'error': f'{type(e).__name__}: {e}'}
+        if ckpt:
+            ckpt.mark(i, res['ok'])
+        return res
+
+    pending: deque = deque()
+    try:
+        for i, item in enumerate(items):
+            if ckpt and ckpt.finished(i):
+                continue
+            while len(pending) >= max_pending:
+                if ordered:
+                    j, fut = pending.popleft()
+                    yield collect(j, fut)
+                else:
+                    yield from _drain_completed(pending, collect)
+            if limiter:
+                limiter.acquire()
+            pending.append((i, submit(item)))
+        while pending:
+            if ordered:
+                j, fut = pending.popleft()
+                yield collect(j, fut)
+            else:
+                yield from _drain_completed(pending, collect)
+    finally:
+        for _, fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=True)
+        for client in clients:
+            client.close()
+        if ckpt:
+            ckpt.save()
+
+
+def _drain_completed(pending: deque, collect: Callable) -> Iterator[Dict[str, Any]]:
+    done, _ = wait([f for _, f in pending], return_when=FIRST_COMPLETED)
+    keep = []
+    for i, fut in pending:
+        if fut in done:
+            yield collect(i, fut)
+        else:
+            keep.append((i, fut))
+    pending.clear()
+    pending.extend(keep)
+
+
+def map_add(items: Iterable[Item], workers: int = 8, executor: str = 'thread',
+            ordered: bool = True, rate: Optional[float] = None,
+            checkpoint: Optional[str] = None, max_pending: Optional[int] = None,
+            **client_options: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Add many memories in parallel.
+
+    Args:
+        items: Memory contents, or dicts of ``OpenMemory.add`` keyword arguments
+        workers: Number of worker threads or processes
+        executor: 'thread' or 'process'
+        ordered: Yield results in input order (False yields as they finish)
+        rate: Maximum requests per second across all workers
+        checkpoint: File recording finished indices; rerunning with the same
+            file and input skips work that already succeeded
+        max_pending: Maximum submitted-but-unyielded items (default 4 * workers)
+        **client_options: Passed to each worker's ``OpenMemory`` client
+            (api_key, base_url, policy, ...). ``dedup`` is ignored: every
+            worker would keep its own SimHash index and miss duplicates sent
+            through the other workers
+
+    Yields:
+        Dicts with ``index``, ``ok`` and either ``result`` or ``error``
+    """
+    client_options['dedup'] = False
+    return _map('add', items, workers, executor, ordered, rate, checkpoint,
+                max_pending, client_options)
+
+
+def map_query(queries: Iterable[Item], workers: int = 8, executor: str = 'thread',
+              ordered: bool = True, rate: Optional[float] = None,
+              checkpoint: Optional[str] = None, max_pending: Optional[int] = None,
+              **client_options: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Run many queries in parallel.
+
+    Args:
+        queries: Query strings, or dicts of ``OpenMemory.query`` keyword arguments
+        workers, executor, ordered, rate, checkpoint, max_pending, client_options:
+            Same as ``map_add``
+
+    Yields:
+        Dicts with ``index``, ``ok`` and either ``result`` or ``error``
+    """
+    return _map('query', queries, workers, executor, ordered, rate, checkpoint,
+                max_pending, client_options)
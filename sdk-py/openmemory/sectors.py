@@ -0,0 +1,223 @@
+"""
+Local port of the backend's sector classifier (``classifyContent``).
+
+The patterns mirror ``SECTOR_CONFIGS`` in ``backend/src/hsg/index.ts`` and the
+scoring reproduces the server exactly, so a query routed with the predicted
+sectors searches the same sectors the server would have picked.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# JS regexes without the `u` flag treat \b, \w, \d and \s as ASCII
+FLAGS = re.IGNORECASE | re.ASCII
+
+SECTOR_CONFIGS: Dict[str, Dict[str, Any]] = {
+    'episodic': {
+        'model': 'episodic-optimized',
+        'decay_lambda': 0.015,
+        'weight': 1.2,
+        'patterns': [
+            r'\b(today|yesterday|last\s+week|remember\s+when|that\s+time)\b',
+            r'\b(I\s+(did|went|saw|met|felt))\b',
+            r'\b(at\s+\d+:\d+|on\s+\w+day|in\s+\d{4})\b',
+            r'\b(happened|occurred|experience|event|moment)\b',
+        ],
+    },
+    'semantic': {
+        'model': 'semantic-optimized',
+        'decay_lambda': 0.005,
+        'weight': 1.0,
+        'patterns': [
+            r'\b(define|definition|meaning|concept|theory)\b',
+            r'\b(what\s+is|how\s+does|why\s+do|facts?\s+about)\b',
+            r'\b(principle|rule|law|algorithm|method)\b',
+            r'\b(knowledge|information|data|research|study)\b',
+        ],
+    },
+    'procedural': {
+        'model': 'procedural-optimized',
+        'decay_lambda': 0.008,
+        'weight': 1.1,
+        'patterns': [
+            r'\b(how\s+to|step\s+by\s+step|procedure|process)\b',
+            r'\b(first|then|next|finally|afterwards)\b',
+            r'\b(install|configure|setup|run|execute)\b',
+            r'\b(tutorial|guide|instructions|manual)\b',
+            r'\b(click|press|type|enter|select)\b',
+        ],
+    },
+    'emotional': {
+        'model': 'emotional-optimized',
+        'decay_lambda': 0.020,
+        'weight': 1.3,
+        'patterns': [
+            r'\b(feel|feeling|felt|emotion|mood)\b',
+            r'\b(happy|sad|angry|excited|worried|anxious|calm)\b',
+            r'\b(love|hate|like|dislike|enjoy|fear)\b',
+            r'\b(amazing|terrible|wonderful|awful|fantastic|horrible)\b',
+            r'[!]{2,}|[\?\!]{2,}',
+        ],
+    },
+    'reflective': {
+        'model': 'reflective-optimized',
+        'decay_lambda': 0.001,
+        'weight': 0.8,
+        'patterns': [
+            r'\b(think|thinking|thought|reflect|reflection)\b',
+            r'\b(realize|understand|insight|conclusion|lesson)\b',
+            r'\b(why|purpose|meaning|significance|impact)\b',
+            r'\b(philosophy|wisdom|belief|value|principle)\b',
+            r'\b(should\s+have|could\s+have|if\s+only|what\s+if)\b',
+        ],
+    },
+}
+
+SECTOR_NAMES: List[str] = list(SECTOR_CONFIGS)
+
+_WORD = re.compile(r'\w+', FLAGS)
+_BOUNDED = re.compile(r'^\\b\((.*)\)\\b$')
+_LEADING = re.compile(r'^([A-Za-z]+)(\?)?')
+
+
+def _split_alternatives(body: str) -> List[str]:
+    alts, depth, cur = [], 0, ''
+    for ch in body:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            alts.append(cur)
+            cur = ''
+            continue
+        cur += ch
+    alts.append(cur)
+    return alts
+
+
+def _first_words(src: str) -> Optional[List[Tuple[str, bool]]]:
+    """
+    Index keys for a ``\\b(alt|alt)\\b`` pattern: the lowercase first word of
+    each alternative and whether that word alone is a full match. Returns None
+    when the pattern has another shape and must always be searched.
+    """
+    m = _BOUNDED.match(src)
+    if not m:
+        return None
+    out = []
+    for alt in _split_alternatives(m.group(1)):
+        lead = _LEADING.match(alt)
+        if not lead:
+            return None
+        word = lead.group(1).lower()
+        exact = lead.group(0) == alt
+        if lead.group(2):
+            # Optional trailing letter, e.g. facts?
+            out.append((word[:-1], exact))
+        out.append((word, exact))
+    return out
+
+
+class SectorClassifier:
+    """
+    Sector classifier backed by one combined keyword table.
+
+    Every alternative in every sector pattern is indexed under its first word,
+    so a single tokenizing pass over the text plus dict lookups finds all the
+    patterns that can fire. Single-word alternatives fire straight from the
+    table; multi-word ones (``last\\s+week``, ``I\\s+(did|went)``, ...) are
+    confirmed with their original regex, and only when their first word occurs.
+    """
+
+    def __init__(self, configs: Optional[Dict[str, Dict[str, Any]]] = None):
+        configs = configs or SECTOR_CONFIGS
+        self.sectors = list(configs)
+        self._pats = []
+        self._table: Dict[str, List[Tuple[int, bool]]] = {}
+        self._always: List[int] = []
+        for sector, cfg in configs.items():
+            for src in cfg['patterns']:
+                pat = re.compile(src, FLAGS)
+                i = len(self._pats)
+                # String.match() without /g returns the match plus one slot
+                # per capture group, and the server adds up that array length.
+                self._pats.append((sector, pat, (pat.groups + 1) * cfg['weight']))
+                entries = _first_words(src)
+                if entries is None:
+                    self._always.append(i)
+                    continue
+                for word, exact in entries:
+                    self._table.setdefault(word, []).append((i, exact))
+
+    def scores(self, content: str) -> Dict[str, float]:
+        """Raw per-sector pattern scores, as computed by the server."""
+        scores = dict.fromkeys(self.sectors, 0)
+        fired = set()
+        checked = set()
+        for i in self._always:
+            checked.add(i)
+            if self._pats[i][1].search(content):
+                fired.add(i)
+        table = self._table
+        for word in {w.lower() for w in _WORD.findall(content)}:
+            for i, exact in table.get(word, ()):
+                if i in checked:
+                    continue
+                checked.add(i)
+                if exact or self._pats[i][1].search(content):
+                    fired.add(i)
+        # Same summation order as the server's pattern loop
+        for i in sorted(fired):
+            sector, _, value = self._pats[i]
+            scores[sector] += value
+        return scores
+
+    def classify(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Classify content into a primary sector plus additional sectors.
+
+        Args:
+            content: Memory or query text
+            metadata: Optional metadata; a valid 'sector' key forces the result
+
+        Returns:
+            Dict with 'primary', 'additional' and 'confidence'
+        """
+        if metadata and metadata.get('sector') in self.sectors:
+            return {'primary': metadata['sector'], 'additional': [], 'confidence': 1.0}
+        ranked = sorted(self.scores(content).items(), key=lambda kv: kv[1], reverse=True)
+        primary, top = ranked[0]
+        threshold = max(1, top * 0.3)
+        additional = [s for s, v in ranked[1:] if v > 0 and v >= threshold]
+        second = ranked[1][1] if len(ranked) > 1 else 0
+        confidence = min(1.0, top / (top + second + 1)) if top > 0 else 0.2
+        return {
+            'primary': primary if top > 0 else 'semantic',
+            'additional': additional,
+            'confidence': confidence
+        }
+
+    def predict_sectors(self, query: str) -> List[str]:
+        """Sectors the server's hsgQuery would search for this query text."""
+        c = self.classify(query)
+        return [c['primary']] + c['additional']
+
+
+_default: Optional[SectorClassifier] = None
+
+
+def classify_content(content: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Classify with a shared default ``SectorClassifier``."""
+    global _default
+    if _default is None:
+        _default = SectorClassifier()
+    return _default.classify(content, metadata)
+
+
+def predict_sectors(query: str) -> List[str]:
+    """Predict the sectors a query will be routed to."""
+    global _default
+    if _default is None:
+        _default = SectorClassifier()
+    return _default.predict_sectors(query)
@@ -0,0 +1,337 @@
+"""
+Sharded local engine: one ``LocalMemory`` per worker process.
+
+The embedded engine scores, blends and expands waypoints in Python, so one
+process uses one core. ``ShardedMemory`` partitions memories by a hash of
+their id across N worker processes. Each worker opens its own shard
+directory, and the vector files are mapped read-only, so the OS page cache
+holds them once however often they are read.
+
+Writes and lookups by id go to the owning shard. A query is scattered to
+every shard; each returns its unreinforced top-k, the parent merges those by
+score, and only the global winners are reinforced. Every shard connection
+carries request ids, so concurrent callers pipeline their requests instead
+of queueing behind each other.
+
+Waypoints work within a shard. Near-duplicate detection needs every earlier
+memory, wherever it landed, so with ``dedup=True`` the parent keeps the one
+SimHash index and the workers run without theirs.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .dedup import DedupStats, SimHashIndex, simhash
+from .local import LocalMemory
+from .sectors import SECTOR_CONFIGS
+
+
+def shard_of(memory_id: str, shards: int) -> int:
+    """Owning shard of ``memory_id`` (stable across processes and runs)."""
+    return zlib.crc32(memory_id.encode()) % shards
+
+
+def _add_many(engine: LocalMemory, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results = []
+    seq = 0
+    for item in items:
+        result, s = engine._add(item['content'], item.get('tags'), item.get('metadata'), item['id'])
+        results.append(result)
+        seq = max(seq, s)
+    engine._sync(seq)
+    return results
+
+
+def _fingerprints(engine: LocalMemory) -> List[Tuple[str, int]]:
+    rows = engine.db.execute('select id, content from memories').fetchall()
+    return [(r['id'], fp) for r in rows for fp in [simhash(r['content'])] if fp is not None]
+
+
+def _reinforce_duplicate(engine: LocalMemory, memory_id: str) -> Optional[Dict[str, Any]]:
+    with engine._lock:
+        done = engine._reinforce_duplicate(memory_id)
+    if done is None:
+        return None
+    result, seq = done
+    engine._sync(seq)
+    return result
+
+
+def _worker(conn, path: Optional[str], options: Dict[str, Any]) -> None:
+    engine = LocalMemory(path, **options)
+    ops = {
+        'add_many': lambda *a: _add_many(engine, *a),
+        'fingerprints': lambda: _fingerprints(engine),
+        'reinforce_duplicate': lambda *a: _reinforce_duplicate(engine, *a)
+    }
+    try:
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+            req, method, args, kwargs = msg
+            try:
+                fn = ops.get(method) or getattr(engine, method)
+                conn.send((req, True, fn(*args, **kwargs)))
+            except Exception as e:
+                conn.send((req, False, e))
+    except EOFError:
+        pass
+    finally:
+        engine.close()
+        conn.close()
+
+
+class _Shard:
+    """Parent side of one worker: a pipe, a send lock and a reply reader."""
+
+    def __init__(self, ctx, path: Optional[str], options: Dict[str, Any]):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child, path, options), daemon=True)
+        self.process.start()
+        child.close()
+        self.pending: Dict[int, Future] = {}
+        self.next_req = 0
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def call(self, method: str, *args, **kwargs) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            self.next_req += 1
+            self.pending[self.next_req] = fut
+            self.conn.send((self.next_req, method, args, kwargs))
+        return fut
+
+    def _read(self) -> None:
+        try:
+            while True:
+                req, ok, value = self.conn.recv()
+                fut = self.pending.pop(req)
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+        except (EOFError, OSError):
+            for fut in list(self.pending.values()):
+                fut.set_exception(RuntimeError('shard worker exited'))
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.send(None)
+        self.process.join()
+        self._reader.join()
+        self.conn.close()
+
+
+class ShardedMemory:
+    """
+    ``LocalMemory`` partitioned across worker processes, with the same API.
+
+    Args:
+        path: Data directory; shard ``i`` lives in ``<path>/shard-<i>`` (None
+            keeps every shard in memory)
+        shards: Number of worker processes (defaults to the CPU count); keep
+            it fixed for a given directory, since it decides which shard owns
+            each id
+        **options: ``LocalMemory`` arguments for every shard (the embedder
+            must be picklable); ``dedup`` and ``dedup_distance`` configure
+            the parent's index instead
+    """
+
+    def __init__(self, path: Optional[str] = None, shards: Optional[int] = None, **options):
+        self.path = path
+        self.n = shards or os.cpu_count() or 1
+        dedup = options.pop('dedup', False)
+        distance = options.pop('dedup_distance', 4)
+        # Workers start from a fresh interpreter: forking a parent that runs
+        # threads can copy held locks
+        ctx = multiprocessing.get_context('spawn')
+        self.shards = [
+            _Shard(ctx, os.path.join(path, f'shard-{i}') if path else None, options)
+            for i in range(self.n)
+        ]
+        self.dedup: Optional[SimHashIndex] = None
+        self.dedup_stats = DedupStats()
+        self._dedup_lock = threading.Lock()
+        if dedup:
+            self.dedup = SimHashIndex(distance)
+            for fps in self._scatter('fingerprints'):
+                for mid, fp in fps:
+                    self.dedup.add(mid, fp)
+
+    def _owner(self, memory_id: str) -> _Shard:
+        return self.shards[shard_of(memory_id, self.n)]
+
+    def _scatter(self, method: str, *args, **kwargs) -> List[Any]:
+        futures = [s.call(method, *args, **kwargs) for s in self.shards]
+        return [f.result() for f in futures]
+
+    # -- writes -------------------------------------------------------------
+
+    def add(self, content: str, tags: Optional[List[str]] = None,
+            metadata: Optional[Dict[str, Any]] = None, salience: float = 0.5,
+            decay_lambda: Optional[float] = None) -> Dict[str, Any]:
+        """Add a memory on the shard that owns its (freshly drawn) id."""
+        return self.add_many([{'content': content, 'tags': tags, 'metadata': metadata}])[0]
+
+    def add_many(self, items: List[Union[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Add several memories; each shard takes its part in one request. With
+        ``dedup``, near-duplicates reinforce the stored memory on its shard.
+        """
+        parts: Dict[int, List] = {}
+        duplicates: List[Tuple[int, str]] = []
+        for i, item in enumerate(items):
+            item = dict({'content': item} if isinstance(item, str) else item, id=str(uuid.uuid4()))
+            hit = self._find_duplicate(item)
+            if hit is not None:
+                duplicates.append((i, hit))
+                continue
+            parts.setdefault(shard_of(item['id'], self.n), []).append((i, item))
+        results: List[Dict[str, Any]] = [{}] * len(items)
+        self._add_parts(parts, results)
+        # After the adds, since a duplicate may point into this batch
+        for i, mid in duplicates:
+            results[i] = self._reinforce_or_add(items[i], mid)
+        return results
+
+    def _reinforce_or_add(self, item: Union[str, Dict[str, Any]], mid: Optional[str]) -> Dict[str, Any]:
+        """Reinforce duplicate ``mid``; if its row is gone, match again or add ``item``."""
+        while mid is not None:
+            res = self._owner(mid).call('reinforce_duplicate', mid).result()
+            if res is not None:
+                return res
+            self._unindex([mid])
+            item = dict({'content': item} if isinstance(item, str) else item, id=str(uuid.uuid4()))
+            mid = self._find_duplicate(item)
+        results: List[Dict[str, Any]] = [{}]
+        self._add_parts({shard_of(item['id'], self.n): [(0, item)]}, results)
+        return results[0]
+
+    def _add_parts(self, parts: Dict[int, List], results: List[Dict[str, Any]]) -> None:
+        """Send each shard its (index, item) pairs and fill ``results``."""
+        futures = {s: self.shards[s].call('add_many', [item for _, item in part]) for s, part in parts.items()}
+        error = None
+        for s, part in parts.items():
+            try:
+                for (i, _), res in zip(part, futures[s].result()):
+                    results[i] = res
+            except Exception as e:
+                # Fingerprints were indexed up front so the batch dedups
+                # against itself; drop the ones whose rows were not stored
+                self._unindex([item['id'] for _, item in part])
+                error = error or e
+        if error is not None:
+            raise error
+
+    def _unindex(self, ids: List[str]) -> None:
+        if self.dedup is not None:
+            with self._dedup_lock:
+                for mid in ids:
+                    self.dedup.remove(mid)
+
+    def _find_duplicate(self, item: Dict[str, Any]) -> Optional[str]:
+        """Id of a stored near-duplicate of ``item``; otherwise indexes it."""
+        if self.dedup is None:
+            return None
+        start = time.perf_counter()
+        fp = simhash(item['content'])
+        if fp is None:
+            return None
+        with self._dedup_lock:
+            hit = self.dedup.find(fp)
+            if hit is None:
+                self.dedup.add(item['id'], fp)
+        self.dedup_stats.record(start, hit is not None)
+        return hit[0] if hit else None
+
+    def reinforce(self, memory_id: str, boost: float = 0.1) -> Dict[str, bool]:
+        return self._owner(memory_id).call('reinforce', memory_id, boost).result()
+
+    def delete(self, memory_id: str) -> Dict[str, bool]:
+        res = self._owner(memory_id).call('delete', memory_id).result()
+        self._unindex([memory_id])
+        return res
+
+    # -- reads --------------------------------------------------------------
+
+    def query(self, query: str, k: int = 8, filters: Optional[Dict[str, Any]] = None,
+              **options) -> Dict[str, Any]:
+        """
+        Scatter the query to every shard and merge their top-k by score.
+
+        Accepts every ``LocalMemory.query`` option; the merged matches are
+        reinforced on their shards unless ``reinforce=False``.
+        """
+        reinforce = options.pop('reinforce', True)
+        lists = self._scatter('query', query, k, filters, reinforce=False, **options)
+        top = sorted((m for res in lists for m in res['matches']),
+                     key=lambda m: m['score'], reverse=True)[:k]
+        if reinforce and top:
+            parts: Dict[int, List] = {}
+            for m in top:
+                parts.setdefault(shard_of(m['id'], self.n), []).append(m)
+            for f in [self.shards[s].call('reinforce_matches', part) for s, part in parts.items()]:
+                f.result()
+        return {'query': query, 'matches': top}
+
+    def query_sector(self, query: str, sector: str, k: int = 8) -> Dict[str, Any]:
+        return self.query(query, k, {'sector': sector})
+
+    def get(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        return self._owner(memory_id).call('get', memory_id).result()
+
+    def all(self, limit: int = 100, offset: int = 0, sector: Optional[str] = None) -> Dict[str, List]:
+        """Memories, newest first, merged from every shard."""
+        items = [i for res in self._scatter('all', limit + offset, 0, sector) for i in res['items']]
+        items.sort(key=lambda i: i['created_at'], reverse=True)
+        return {'items': items[offset:offset + limit]}
+
+    def get_by_sector(self, sector: str, limit: int = 100, offset: int = 0) -> Dict[str, List]:
+        return self.all(limit, offset, sector)
+
+    def recent(self, n: int = 10, sector: Optional[str] = None) -> Dict[str, List]:
+        items = [i for res in self._scatter('recent', n, sector) for i in res['items']]
+        items.sort(key=lambda i: i['created_at'], reverse=True)
+        return {'items': items[:n]}
+
+    def sectors(self) -> Dict[str, Any]:
+        """Sector configs with counts and mean salience summed over shards."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for res in self._scatter('sectors'):
+            for row in res['stats']:
+                m = merged.setdefault(row['sector'], {'sector': row['sector'], 'count': 0, 'total': 0.0})
+                m['count'] += row['count']
+                m['total'] += (row['avg_salience'] or 0.0) * row['count']
+        stats = [{'sector': m['sector'], 'count': m['count'], 'avg_salience': m['total'] / m['count']}
+                 for m in merged.values()]
+        configs = {s: {k: v for k, v in cfg.items() if k != 'patterns'} for s, cfg in SECTOR_CONFIGS.items()}
+        return {'sectors': list(SECTOR_CONFIGS), 'configs': configs, 'stats': stats}
+
+    get_sectors = sectors
+
+    def health(self) -> Dict[str, Any]:
+        res = self.shards[0].call('health').result()
+        res['shards'] = self.n
+        return res
+
+    get_health = health
+
+    def stats(self) -> List[Dict[str, Dict]]:
+        """``LocalMemory.stats()`` of every shard, in shard order."""
+        return self._scatter('stats')
+
+    def flush(self) -> None:
+        self._scatter('flush')
+
+    def close(self) -> None:
+        for s in self.shards:
+            s.close()
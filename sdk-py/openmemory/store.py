@@ -0,0 +1,493 @@
+"""
+Per-sector vector store for the local engine.
+
+Each sector is a row-major float32 matrix in an append-only file read through
+``mmap`` (``<name>.f32``), with the memory id of every row in ``<name>.ids``
+and deleted rows in ``<name>.dead``. Only row norms, the id map and the
+optional compressed codes (``<name>.codes``) are held in RAM; full-precision
+rows are paged in from the mapping when they are scored.
+
+Deleted rows stay in the files as tombstones until ``compact()`` rewrites
+them without the dead rows and swaps the new files in.
+"""
+
+import heapq
+import json
+import math
+import mmap
+import operator
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .quantize import PQCodes, make_codes
+
+_mul = operator.mul
+# Files rewritten by compact(); the marker file says the rewrite is complete
+_COMPACTED = ('f32', 'ids', 'dead', 'codes', 'pq')
+_MARKER = 'compact'
+# Rows copied per read while compacting
+_COPY_ROWS = 1024
+
+
+def _runs(rows: List[int], limit: int = _COPY_ROWS) -> Iterable[Tuple[int, int]]:
+    """(first row, count) of each run of consecutive ``rows``, at most ``limit`` long."""
+    i = 0
+    while i < len(rows):
+        j = i + 1
+        while j < len(rows) and j - i < limit and rows[j] == rows[j - 1] + 1:
+            j += 1
+        yield rows[i], j - i
+        i = j
+
+
+class VectorStore:
+    """
+    Append-only float32 matrix with cosine top-k search.
+
+    Args:
+        path: Directory for the store files (None keeps everything in memory)
+        name: File name prefix, usually the sector
+        dim: Vector dimension
+        quantization: None for exact search, 'int8' or 'pq' to score on
+            compressed codes and re-rank the shortlist exactly. 'int8' only
+            saves RAM: its pure-Python scan is slower than exact search.
+            'pq' saves RAM and is faster
+        rerank: Shortlist size as a multiple of k when quantized
+        train_size: Vectors collected before the PQ codebooks are trained;
+            until then searches are exact
+        pq_options: Extra ``PQCodes`` arguments (dsub, ks, iters)
+    """
+
+    def __init__(self, path: Optional[str], name: str, dim: int,
+                 quantization: Optional[str] = None, rerank: int = 10,
+                 train_size: int = 1024, pq_options: Optional[Dict] = None):
+        self.path = path
+        self.name = name
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.rerank = rerank
+        self.train_size = train_size
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.dead: Set[int] = set()
+        self.inv_norms = array('f')
+        self.codes = make_codes(quantization, dim, **(pq_options or {}))
+        self._mem = array('f') if path is None else None
+        self._mm: Optional[mmap.mmap] = None
+        self._mapped_rows = 0
+        self._files = {}
+        self._compacting = False
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def _file(self, ext: str) -> str:
+        return os.path.join(self.path, f'{self.name}.{ext}')
+
+    # -- open ---------------------------------------------------------------
+
+    def _load(self) -> None:
+        self._finish_swap()
+        ids = self._read_lines('ids')
+        vec_rows = os.path.getsize(self._file('f32')) // self.row_bytes if os.path.exists(self._file('f32')) else 0
+        # Rows are committed by their id line, written last. Files are only
+        # ever cut, never rewritten, so a crash here cannot lose rows.
+        n = min(len(ids), vec_rows)
+        self.ids = ids[:n]
+        self._truncate('f32', n * self.row_bytes)
+        self._truncate('ids', sum(len(i.encode()) + 1 for i in self.ids))
+        self.dead = {r for r in map(int, self._read_lines('dead')) if r < n}
+        self.rows = {i: r for r, i in enumerate(self.ids) if r not in self.dead}
+
+        self._remap()
+        with self._matrix() as mv:
+            for r in range(n):
+                self.inv_norms.append(self._inv_norm(mv[r * self.dim:(r + 1) * self.dim]))
+
+        if self.codes is not None:
+            if isinstance(self.codes, PQCodes) and os.path.exists(self._file('pq')):
+                with open(self._file('pq')) as f:
+                    self.codes = PQCodes.from_state(self.dim, json.load(f))
+            if self.codes.trained:
+                raw = b''
+                if os.path.exists(self._file('codes')):
+                    with open(self._file('codes'), 'rb') as f:
+                        raw = f.read(n * self.codes.row_bytes)
+                self.codes.load(raw)
+                self._truncate('codes', len(self.codes) * self.codes.row_bytes)
+                # Rows whose codes were lost in a crash are re-encoded
+                missing = [self.codes.encode(self.vector(r)) for r in range(len(self.codes), n)]
+                for raw in missing:
+                    self.codes.append_encoded(raw)
+                self._write('codes', b''.join(missing))
+
+        for ext in ('f32', 'ids', 'dead', 'codes'):
+            self._files[ext] = open(self._file(ext), 'ab')
+
+    def _finish_swap(self) -> None:
+        """Complete a compaction swap interrupted by a crash, or drop its leftovers."""
+        done = os.path.exists(self._file(_MARKER))
+        for ext in _COMPACTED:
+            new = self._file(ext + '.new')
+            if os.path.exists(new):
+                if done:
+                    os.replace(new, self._file(ext))
+                else:
+                    os.remove(new)
+        if done:
+            os.remove(self._file(_MARKER))
+
+    def _read_lines(self, ext: str) -> List[str]:
+        """Complete lines of a text file; a torn last line is cut off the file."""
+        if not os.path.exists(self._file(ext)):
+            return []
+        with open(self._file(ext), 'rb') as f:
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        self._truncate(ext, end)
+        return data[:end].decode().splitlines()
+
+    def _truncate(self, ext: str, size: int) -> None:
+        path = self._file(ext)
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+
+    def _write(self, ext: str, data: bytes) -> None:
+        f = self._files.get(ext)
+        if f is not None and data:
+            f.write(data)
+        elif self.path and data:
+            with open(self._file(ext), 'ab') as f:
+                f.write(data)
+
+    # -- rows ---------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.rows
+
+    @staticmethod
+    def _inv_norm(vec: Sequence[float]) -> float:
+        n = math.sqrt(sum(map(_mul, vec, vec)))
+        return 1 / n if n else 0.0
+
+    def _remap(self) -> None:
+        if self._mem is not None:
+            return
+        f = self._files.get('f32')
+        if f is not None:
+            f.flush()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._mapped_rows = 0
+        if self.ids:
+            with open(self._file('f32'), 'rb') as fh:
+                self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_rows = len(self.ids)
+
+    def _matrix(self) -> memoryview:
+        """Flat float view over every row; release it before the next write."""
+        if self._mem is not None:
+            return memoryview(self._mem)
+        if self._mapped_rows < len(self.ids):
+            self._remap()
+        if self._mm is None:
+            return memoryview(array('f'))
+        return memoryview(self._mm).cast('f')
+
+    def vector(self, row: int) -> array:
+        with self._matrix() as mv:
+            return array('f', mv[row * self.dim:(row + 1) * self.dim])
+
+    def get(self, id: str) -> Optional[array]:
+        row = self.rows.get(id)
+        return None if row is None else self.vector(row)
+
+    def add(self, id: str, vec: Sequence[float]) -> int:
+        """Append a vector for ``id`` (replacing any previous one); returns its row."""
+        if len(vec) != self.dim:
+            raise ValueError(f'expected {self.dim} dimensions, got {len(vec)}')
+        if id in self.rows:
+            self.delete(id)
+        vec = vec if isinstance(vec, array) and vec.typecode == 'f' else array('f', vec)
+        row = len(self.ids)
+        if self._mem is not None:
+            self._mem.extend(vec)
+        self._write('f32', vec.tobytes())
+        if self.codes is not None and self.codes.trained:
+            raw = self.codes.encode(vec)
+            self.codes.append_encoded(raw)
+            self._write('codes', raw)
+        self._write('ids', (id + '\n').encode())
+        self.ids.append(id)
+        self.rows[id] = row
+        self.inv_norms.append(self._inv_norm(vec))
+        if isinstance(self.codes, PQCodes) and not self.codes.trained and len(self.rows) >= self.train_size:
+            self.train()
+        return row
+
+    def delete(self, id: str) -> bool:
+        row = self.rows.pop(id, None)
+        if row is None:
+            return False
+        self.dead.add(row)
+        self._write('dead', f'{row}\n'.encode())
+        return True
+
+    def live_rows(self) -> Iterable[int]:
+        return self.rows.values()
+
+    # -- quantization -------------------------------------------------------
+
+    def train(self, seed: int = 0) -> None:
+        """Train the PQ codebooks on a sample of live rows and encode every row."""
+        if not isinstance(self.codes, PQCodes) or not self.rows:
+            return
+        rows = list(self.rows.values())
+        sample = random.Random(seed).sample(rows, min(self.train_size, len(rows)))
+        self.codes.train([self.vector(r) for r in sample], seed)
+        self.codes.codes = array('B')
+        raw = [self.codes.encode(self.vector(r)) for r in range(len(self.ids))]
+        for code in raw:
+            self.codes.append_encoded(code)
+        if self.path:
+            tmp = self._file('pq.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(self.codes.state(), f)
+            os.replace(tmp, self._file('pq'))
+            self._files['codes'].close()
+            with open(self._file('codes'), 'wb') as f:
+                f.write(b''.join(raw))
+            self._files['codes'] = open(self._file('codes'), 'ab')
+
+    # -- search -------------------------------------------------------------
+
+    def search(self, query: Sequence[float], k: int,
+               rows: Optional[Iterable[int]] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k rows by cosine similarity (cosineSimilarity in the backend).
+
+        With quantization enabled, every candidate is scored on its codes and
+        only the best ``k * rerank`` are re-scored against the float32 rows.
+
+        Args:
+            query: Query vector
+            k: Number of results
+            rows: Optional candidate rows to restrict the search to
+
+        Returns:
+            List of (id, similarity), best first
+        """
+        qinv = self._inv_norm(query)
+        if not qinv or k <= 0:
+            return []
+        dead = self.dead
+        cand = self.live_rows() if rows is None else [r for r in rows if r not in dead]
+        inv = self.inv_norms
+        codes = self.codes
+        if codes is not None and codes.trained and len(codes) == len(self.ids):
+            cand = list(cand)
+            approx = codes.scores(query, cand)
+            short = heapq.nlargest(k * self.rerank, zip(map(_mul, approx, map(inv.__getitem__, cand)), cand))
+            cand = [r for _, r in short]
+        d = self.dim
+        q = list(query)
+        with self._matrix() as mv:
+            scored = [(sum(map(_mul, q, mv[r * d:(r + 1) * d])) * inv[r] * qinv, r) for r in cand]
+        ids = self.ids
+        return [(ids[r], s) for s, r in heapq.nlargest(k, scored)]
+
+    # -- compaction ---------------------------------------------------------
+
+    def compact(self, lock: Optional[ContextManager] = None, retrain: bool = False,
+                progress: Optional[Callable[[int, int], None]] = None,
+                on_swap: Optional[Callable[[List[int]], None]] = None) -> Dict:
+        """
+        Rewrite the store without its dead rows while it keeps serving.
+
+        Live rows and their codes are copied into ``*.new`` files without
+        holding ``lock``. Rows added or deleted meanwhile are caught up under
+        it, and the new files are swapped in before it is released. A crash
+        leaves either the old or the new files (see ``_finish_swap``).
+
+        Args:
+            lock: Lock held by every reader and writer of this store
+            retrain: Retrain the PQ codebooks on the live rows and re-encode them
+            progress: Called with (rows copied, rows to copy)
+            on_swap: Called under ``lock`` with the old row of every new row,
+                so row-aligned indexes can be remapped
+
+        Returns:
+            Rows before and after, reclaimed bytes and copy/swap times (ms)
+        """
+        lock = lock if lock is not None else nullcontext()
+        start = time.perf_counter()
+        with lock:
+            if self._compacting:
+                raise RuntimeError(f'{self.name} is already being compacted')
+            self._compacting = True
+            self.flush()
+            n0 = len(self.ids)
+            dead0 = set(self.dead)
+            keep = [r for r in range(n0) if r not in dead0]
+            ids = [self.ids[r] for r in keep]
+            inv = array('f', map(self.inv_norms.__getitem__, keep))
+            codes0 = self.codes if self.codes is not None and self.codes.trained else None
+
+        d, rb = self.dim, self.row_bytes
+        src = open(self._file('f32'), 'rb') if self.path else None
+        out = {ext: open(self._file(ext + '.new'), 'wb') for ext in ('f32', 'codes')} if self.path else {}
+        mem = array('f') if self._mem is not None else None
+        swapped = False
+
+        def read(r0: int, count: int) -> bytes:
+            if src is None:
+                return self._mem[r0 * d:(r0 + count) * d].tobytes()
+            src.seek(r0 * rb)
+            return src.read(count * rb)
+
+        try:
+            encode = retrain and isinstance(codes0, PQCodes) and bool(keep)
+            if encode:
+                sample = random.Random(0).sample(keep, min(self.train_size, len(keep)))
+                codes = PQCodes(d, codes0.dsub, codes0.ks, codes0.iters)
+                codes.train([array('f', read(r, 1)) for r in sample])
+            elif isinstance(codes0, PQCodes):
+                codes = PQCodes.from_state(d, codes0.state())
+            elif codes0 is not None:
+                codes = make_codes(codes0.kind, d)
+            else:
+                codes = self.codes
+
+            def copy(rows: List[int], done: int, total: int) -> None:
+                for r0, count in _runs(rows):
+                    raw = read(r0, count)
+                    if mem is not None:
+                        mem.frombytes(raw)
+                    else:
+                        out['f32'].write(raw)
+                    if encode:
+                        vecs = array('f', raw)
+                        code = b''.join(codes.encode(vecs[i * d:(i + 1) * d]) for i in range(count))
+                    elif codes0 is not None:
+                        code = b''.join(map(self.codes.row, range(r0, r0 + count)))
+                    else:
+                        code = b''
+                    if code:
+                        codes.load(code)
+                        if out:
+                            out['codes'].write(code)
+                    done += count
+                    if progress is not None:
+                        progress(done, total)
+
+            copy(keep, 0, len(keep))
+            copy_ms = (time.perf_counter() - start) * 1000
+
+            with lock:
+                swap_start = time.perf_counter()
+                self.flush()
+                n1 = len(self.ids)
+                tail = [r for r in range(n0, n1) if r not in self.dead]
+                copy(tail, len(keep), len(keep) + len(tail))
+                keep += tail
+                ids += [self.ids[r] for r in tail]
+                inv.extend(map(self.inv_norms.__getitem__, tail))
+                # Rows deleted during the copy keep their tombstone, renumbered
+                dead = sorted(bisect_left(keep, r) for r in self.dead - dead0 if r < n0)
+                # PQ training during the copy re-encoded every row; redo it below
+                late_train = codes0 is None and self.codes is not None and self.codes.trained
+                if self.path:
+                    with open(self._file('ids.new'), 'w') as f:
+                        f.write(''.join(i + '\n' for i in ids))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    with open(self._file('dead.new'), 'w') as f:
+                        f.write(''.join(f'{r}\n' for r in dead))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    if encode:
+                        with open(self._file('pq.new'), 'w') as f:
+                            json.dump(codes.state(), f)
+                    for f in out.values():
+                        f.flush()
+                        os.fsync(f.fileno())
+                        f.close()
+                    for f in self._files.values():
+                        f.close()
+                    if self._mm is not None:
+                        self._mm.close()
+                        self._mm = None
+                    with open(self._file(_MARKER), 'w'):
+                        pass
+                    self._finish_swap()
+                    self._files = {ext: open(self._file(ext), 'ab') for ext in ('f32', 'ids', 'dead', 'codes')}
+                else:
+                    self._mem = mem
+                swapped = True
+                self.ids = ids
+                self.dead = set(dead)
+                self.rows = {i: r for r, i in enumerate(ids) if r not in self.dead}
+                self.inv_norms = inv
+                if not late_train:
+                    self.codes = codes
+                self._remap()
+                if late_train:
+                    self.train()
+                if on_swap is not None:
+                    on_swap(keep)
+                swap_ms = (time.perf_counter() - swap_start) * 1000
+        finally:
+            if src is not None:
+                src.close()
+            for f in out.values():
+                f.close()
+            if self.path and not swapped:
+                self._finish_swap()
+            self._compacting = False
+        code_bytes = codes.row_bytes if codes is not None and codes.trained else 0
+        return {
+            'rows_before': n1,
+            'rows_after': len(keep),
+            'reclaimed_bytes': (n1 - len(keep)) * (rb + code_bytes),
+            'retrained': encode,
+            'copy_ms': copy_ms,
+            'swap_ms': swap_ms
+        }
+
+    # -- housekeeping -------------------------------------------------------
+
+    def stats(self) -> Dict:
+        return {
+            'rows': len(self.ids),
+            'live': len(self.rows),
+            'dim': self.dim,
+            'vector_bytes': len(self.ids) * self.row_bytes,
+            'quantization': self.codes.kind if self.codes is not None else None,
+            'code_bytes': self.codes.nbytes() if self.codes is not None else 0,
+            'trained': self.codes.trained if self.codes is not None else False
+        }
+
+    def flush(self, sync: bool = False) -> None:
+        for f in self._files.values():
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
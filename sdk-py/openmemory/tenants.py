@@ -0,0 +1,254 @@
+"""
+Multi-tenant local engine: one ``LocalMemory`` per namespace.
+
+Every namespace (``user_id``) gets its own directory with its own SQLite
+rows, sector vector stores, graph and indexes. A query therefore only scans
+that tenant's vectors, and its cost depends on the tenant's size rather than
+the whole deployment. Each tenant also gets its own embedding cache budget,
+so a heavy tenant cannot evict another tenant's cached embeddings.
+
+Tenants are opened on first use. Tenants that sit idle for
+``idle_seconds``, or that fall out of the ``max_open`` most recently used,
+are closed again. A tenant is never closed while a call is using it.
+"""
+
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .cache import EmbeddingCache
+from .embedding import Embedder
+from .local import LocalMemory
+
+DEFAULT_NAMESPACE = 'default'
+_NAME = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.@-]*$')
+
+
+class _Tenant:
+    def __init__(self):
+        self.engine: Optional[LocalMemory] = None
+        self.users = 0
+        self.last_used = 0.0
+        # Held while the engine is opened or closed
+        self.lock = threading.Lock()
+
+
+class TenantMemory:
+    """
+    Namespace-partitioned ``LocalMemory`` with the ``OpenMemory`` API plus a
+    ``user_id`` argument on every call.
+
+    Args:
+        path: Data directory; namespace ``ns`` lives in ``<path>/ns/<ns>``
+            (None keeps tenants in memory, so unloading one discards it)
+        idle_seconds: Close tenants unused for this long
+        max_open: Most tenants kept open at once (least recently used closed first)
+        cache_items: Per-tenant embedding cache budget (0 disables the caches)
+        budgets: Per-namespace overrides of ``cache_items``
+        **options: ``LocalMemory`` arguments shared by every tenant
+    """
+
+    def __init__(self, path: Optional[str] = None, idle_seconds: float = 300.0,
+                 max_open: int = 64, cache_items: int = 1000,
+                 budgets: Optional[Dict[str, int]] = None, **options):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.max_open = max_open
+        self.cache_items = cache_items
+        self.budgets = budgets or {}
+        self.options = options
+        self.embedder = options.pop('embedder', None) or Embedder('synthetic', options.get('dim', 768))
+        self.tenants: 'OrderedDict[str, _Tenant]' = OrderedDict()
+        self.loads = 0
+        self.unloads = 0
+        self.open = 0
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    # -- tenant lifecycle ---------------------------------------------------
+
+    def _dir(self, namespace: str) -> Optional[str]:
+        return os.path.join(self.path, 'ns', namespace) if self.path else None
+
+    def _open(self, namespace: str) -> LocalMemory:
+        embedder = self.embedder
+        budget = self.budgets.get(namespace, self.cache_items)
+        if budget and isinstance(embedder, Embedder):
+            # Same model, tenant-private cache
+            embedder = copy.copy(embedder)
+            cache_dir = self._dir(namespace)
+            embedder.cache = EmbeddingCache(os.path.join(cache_dir, 'cache') if cache_dir else None, budget)
+        return LocalMemory(self._dir(namespace), embedder=embedder, **self.options)
+
+    @staticmethod
+    def _close(engine: LocalMemory) -> None:
+        cache = getattr(engine.embedder, 'cache', None)
+        engine.close()
+        if cache is not None:
+            cache.close()
+
+    @contextmanager
+    def tenant(self, user_id: Optional[str] = None) -> Iterator[LocalMemory]:
+        """Engine of one namespace, loaded if needed and pinned while in use."""
+        namespace = user_id or DEFAULT_NAMESPACE
+        if not _NAME.match(namespace):
+            raise ValueError(f'invalid namespace: {namespace!r}')
+        with self._lock:
+            t = self.tenants.get(namespace)
+            if t is None:
+                t = self.tenants[namespace] = _Tenant()
+            self.tenants.move_to_end(namespace)
+            t.users += 1
+            t.last_used = time.monotonic()
+        try:
+            with t.lock:
+                if t.engine is None:
+                    t.engine = self._open(namespace)
+                    with self._lock:
+                        self.loads += 1
+                        self.open += 1
+            yield t.engine
+        finally:
+            with self._lock:
+                t.users -= 1
+                t.last_used = now = time.monotonic()
+                # Sweeps walk every tenant, so they run at most a few times
+                # per idle period unless too many tenants are open
+                sweep = self.open > self.max_open or now >= self._next_sweep
+            if sweep:
+                self.unload_idle()
+
+    def unload_idle(self) -> int:
+        """Close idle and least recently used tenants; returns how many closed."""
+        now = time.monotonic()
+        with self._lock:
+            self._next_sweep = now + min(self.idle_seconds / 4, 60.0)
+            loaded = [(ns, t) for ns, t in self.tenants.items() if t.engine is not None]
+            excess = len(loaded) - self.max_open
+            victims = []
+            for ns, t in loaded:  # least recently used first
+                if t.users:
+                    continue
+                if excess > 0 or now - t.last_used >= self.idle_seconds:
+                    victims.append(t)
+                    excess -= 1
+        closed = 0
+        for t in victims:
+            with t.lock:
+                with self._lock:
+                    # Re-checked: a caller may have pinned it meanwhile
+                    if t.users or t.engine is None:
+                        continue
+                    engine, t.engine = t.engine, None
+                    self.unloads += 1
+                    self.open -= 1
+                self._close(engine)
+                closed += 1
+        with self._lock:
+            # Entries of unloaded tenants are recreated on demand, so a long
+            # tail of namespaces does not pile up
+            for ns in [ns for ns, t in self.tenants.items() if t.engine is None and not t.users]:
+                del self.tenants[ns]
+        return closed
+
+    def namespaces(self) -> List[str]:
+        """Every namespace with data on disk or open in memory."""
+        names = set(ns for ns, t in self.tenants.items() if t.engine is not None)
+        if self.path and os.path.isdir(os.path.join(self.path, 'ns')):
+            names.update(os.listdir(os.path.join(self.path, 'ns')))
+        return sorted(names)
+
+    # -- OpenMemory API -----------------------------------------------------
+
+    def add(self, content: str, tags: Optional[List[str]] = None,
+            metadata: Optional[Dict[str, Any]] = None, salience: float = 0.5,
+            decay_lambda: Optional[float] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+        with self.tenant(user_id) as mem:
+            return mem.add(content, tags, metadata, salience, decay_lambda)
+
+    def add_many(self, items: List[Union[str, Dict[str, Any]]],
+                 user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self.tenant(user_id) as mem:
+            return mem.add_many(items)
+
+    def query(self, query: str, k: int = 8, filters: Optional[Dict[str, Any]] = None,
+              user_id: Optional[str] = None, **options) -> Dict[str, Any]:
+        """Query one namespace; accepts every ``LocalMemory.query`` option."""
+        with self.tenant(user_id) as mem:
+            return mem.query(query, k, filters, **options)
+
+    def query_sector(self, query: str, sector: str, k: int = 8,
+                     user_id: Optional[str] = None) -> Dict[str, Any]:
+        return self.query(query, k, {'sector': sector}, user_id)
+
+    def reinforce(self, memory_id: str, boost: float = 0.1,
+                  user_id: Optional[str] = None) -> Dict[str, bool]:
+        with self.tenant(user_id) as mem:
+            return mem.reinforce(memory_id, boost)
+
+    def delete(self, memory_id: str, user_id: Optional[str] = None) -> Dict[str, bool]:
+        with self.tenant(user_id) as mem:
+            return mem.delete(memory_id)
+
+    def get(self, memory_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        with self.tenant(user_id) as mem:
+            return mem.get(memory_id)
+
+    def all(self, limit: int = 100, offset: int = 0, sector: Optional[str] = None,
+            user_id: Optional[str] = None) -> Dict[str, List]:
+        with self.tenant(user_id) as mem:
+            return mem.all(limit, offset, sector)
+
+    def get_by_sector(self, sector: str, limit: int = 100, offset: int = 0,
+                      user_id: Optional[str] = None) -> Dict[str, List]:
+        return self.all(limit, offset, sector, user_id)
+
+    def recent(self, n: int = 10, sector: Optional[str] = None,
+               user_id: Optional[str] = None) -> Dict[str, List]:
+        with self.tenant(user_id) as mem:
+            return mem.recent(n, sector)
+
+    def sectors(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+        with self.tenant(user_id) as mem:
+            return mem.sectors()
+
+    get_sectors = sectors
+
+    def health(self) -> Dict[str, Any]:
+        with self.tenant() as mem:
+            res = mem.health()
+        res['namespaces'] = len(self.namespaces())
+        return res
+
+    get_health = health
+
+    def stats(self) -> Dict[str, Any]:
+        """Load/unload counters plus store and cache stats of open tenants."""
+        with self._lock:
+            open_engines = {ns: t.engine for ns, t in self.tenants.items() if t.engine is not None}
+        tenants = {}
+        for ns, engine in open_engines.items():
+            cache = getattr(engine.embedder, 'cache', None)
+            tenants[ns] = {'stores': engine.stats(), 'cache': cache.stats() if cache is not None else None}
+        return {'open': len(open_engines), 'loads': self.loads, 'unloads': self.unloads, 'tenants': tenants}
+
+    def flush(self) -> None:
+        with self._lock:
+            engines = [t.engine for t in self.tenants.values() if t.engine is not None]
+        for engine in engines:
+            engine.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            tenants = list(self.tenants.values())
+        for t in tenants:
+            with t.lock:
+                if t.engine is not None:
+                    self._close(t.engine)
+                    t.engine = None
+        self.open = 0
@@ -0,0 +1,45 @@
+"""
+Creation-time index for the local engine's vector stores.
+
+Memories are appended to every store in ``created_at`` order, so the creation
+times of a store's rows form a sorted array. A ``since``/``until`` window is
+then two binary searches and a contiguous row range, with no scan.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+
+class TimeIndex:
+    """Non-decreasing ``created_at`` (ms) of each row of one store."""
+
+    def __init__(self):
+        self.times = array('q')
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def append(self, ts: int) -> None:
+        if self.times and ts < self.times[-1]:
+            raise ValueError('timestamps must be appended in order')
+        self.times.append(ts)
+
+    def rows(self, since: Optional[int] = None, until: Optional[int] = None) -> range:
+        """Rows created in ``[since, until]`` (either bound may be open)."""
+        lo = 0 if since is None else bisect_left(self.times, since)
+        hi = len(self.times) if until is None else bisect_right(self.times, until)
+        return range(lo, max(lo, hi))
+
+    @classmethod
+    def rebuild(cls, row_times: array) -> 'TimeIndex':
+        """
+        Index from per-row times where rows without a known time (deleted
+        memories) are 0; those take the previous row's time.
+        """
+        idx = cls()
+        last = 0
+        for ts in row_times:
+            last = ts if ts else last
+            idx.times.append(last)
+        return idx
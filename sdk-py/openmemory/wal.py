@@ -0,0 +1,235 @@
+"""
+Append-only write-ahead log with group commit for the local engine.
+
+Every mutation is appended to ``wal.log`` as one checksummed JSON line before
+the caller returns. Writers that arrive while a write is in flight queue
+their lines, and the next writer to take over writes and syncs the whole
+queue at once, so concurrent callers share a single ``fsync``.
+
+The engine applies mutations straight away and makes them durable in the
+vector files and SQLite only at a checkpoint, after which the log is
+truncated. The vector and graph files may run ahead of the log between
+checkpoints, so on open they are cut back to their checkpointed sizes and
+whatever the log still holds is replayed on top. Records are idempotent, so
+replaying one that was already checkpointed is harmless.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+from array import array
+from typing import Any, Callable, Dict, List, Optional
+
+DURABILITY = ('batch', 'interval', 'none')
+
+
+def _encode(obj: Any) -> Any:
+    if isinstance(obj, array):
+        return {'__f32__': base64.b64encode(obj.tobytes()).decode()}
+    raise TypeError(f'cannot log {type(obj).__name__}')
+
+
+def _decode(obj: Dict) -> Any:
+    if '__f32__' in obj:
+        vec = array('f')
+        vec.frombytes(base64.b64decode(obj['__f32__']))
+        return vec
+    return obj
+
+
+class WriteAheadLog:
+    """
+    Group-committed mutation log.
+
+    Args:
+        path: Log file
+        durability: 'batch' (fsync once per group commit), 'interval' (fsync
+            every ``sync_interval`` seconds) or 'none' (leave it to the OS)
+        sync_interval: Seconds between background ticks (interval fsyncs and
+            checkpoint checks)
+        checkpoint_bytes: Log size that triggers a background checkpoint
+        checkpoint_interval: Seconds after which a non-empty log is checkpointed
+    """
+
+    def __init__(self, path: str, durability: str = 'batch', sync_interval: float = 1.0,
+                 checkpoint_bytes: int = 16 << 20, checkpoint_interval: float = 60.0):
+        if durability not in DURABILITY:
+            raise ValueError(f'unknown durability: {durability}')
+        self.path = path
+        self.durability = durability
+        self.sync_interval = sync_interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self.checkpoint_interval = checkpoint_interval
+        self.seq = 0
+        self.size = 0
+        self.records = 0
+        self.groups = 0
+        self.syncs = 0
+        self.checkpoints = 0
+        self.checkpoint_ms = 0.0
+        self._written = 0
+        self._pending: List[bytes] = []
+        self._writing = False
+        # _cond guards the queue and counters; _io guards the file itself
+        self._cond = threading.Condition()
+        self._io = threading.Lock()
+        self._file = None
+        self._dirty = False
+        self._last_checkpoint = time.monotonic()
+        self._checkpoint: Optional[Callable[[], None]] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -- recovery -----------------------------------------------------------
+
+    def replay(self) -> List[Dict]:
+        """
+        Records left in the log, in order. A torn or corrupt tail (a crash
+        mid-write) is cut off. Opens the log for appending afterwards.
+        """
+        records = []
+        good = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    crc, _, body = line.rstrip(b'\n').partition(b' ')
+                    if not line.endswith(b'\n') or crc != b'%08x' % zlib.crc32(body):
+                        break
+                    records.append(json.loads(body, object_hook=_decode))
+                    good += len(line)
+            if good != os.path.getsize(self.path):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(good)
+        self.size = good
+        self._file = open(self.path, 'ab')
+        return records
+
+    # -- writes -------------------------------------------------------------
+
+    def append(self, record: Dict) -> int:
+        """
+        Queue a record and return its sequence number. Call ``sync`` with it
+        (outside any engine lock) before acknowledging the write.
+        """
+        body = json.dumps(record, separators=(',', ':'), default=_encode).encode()
+        line = b'%08x ' % zlib.crc32(body) + body + b'\n'
+        with self._cond:
+            self.seq += 1
+            self.records += 1
+            self._pending.append(line)
+            return self.seq
+
+    def sync(self, seq: int) -> None:
+        """Block until record ``seq`` is written (and synced, per ``durability``)."""
+        with self._cond:
+            while self._written < seq:
+                if self._writing:
+                    # Another writer is flushing; our line joins the next group
+                    self._cond.wait()
+                    continue
+                self._writing = True
+                batch, self._pending = self._pending, []
+                upto = self.seq
+                self._cond.release()
+                try:
+                    self._write(batch)
+                finally:
+                    self._cond.acquire()
+                    self._writing = False
+                    self._written = max(self._written, upto)
+                    self.groups += 1
+                    self._cond.notify_all()
+
+    def _write(self, batch: List[bytes]) -> None:
+        data = b''.join(batch)
+        with self._io:
+            if self._file is None:
+                return
+            self._file.write(data)
+            self._file.flush()
+            self.size += len(data)
+            if self.durability == 'batch':
+                os.fsync(self._file.fileno())
+                self.syncs += 1
+            else:
+                self._dirty = True
+
+    def truncate(self) -> None:
+        """
+        Drop every record appended so far. Only call once their effects are
+        durable elsewhere, with appends held off.
+        """
+        with self._cond:
+            self._pending = []
+            upto = self.seq
+        with self._io:
+            if self._file is not None:
+                self._file.close()
+                self._file = open(self.path, 'wb')
+                os.fsync(self._file.fileno())
+            self.size = 0
+            self._dirty = False
+        with self._cond:
+            self._written = max(self._written, upto)
+            self._cond.notify_all()
+
+    # -- background ---------------------------------------------------------
+
+    def start(self, checkpoint: Callable[[], None]) -> None:
+        """Run interval fsyncs and size/age-triggered ``checkpoint`` calls."""
+        self._checkpoint = checkpoint
+        self._thread = threading.Thread(target=self._loop, name='openmemory-wal', daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            try:
+                if self.durability == 'interval':
+                    self.fsync()
+                age = time.monotonic() - self._last_checkpoint
+                if self.size >= self.checkpoint_bytes or (self.size and age >= self.checkpoint_interval):
+                    self._checkpoint()
+            except Exception:
+                # The engine may be closing; the next tick retries
+                continue
+
+    def fsync(self) -> None:
+        with self._io:
+            if self._file is not None and self._dirty:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+                self.syncs += 1
+
+    def checkpointed(self, elapsed_ms: float) -> None:
+        self.checkpoints += 1
+        self.checkpoint_ms += elapsed_ms
+        self._last_checkpoint = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'durability': self.durability,
+            'records': self.records,
+            'groups': self.groups,
+            'syncs': self.syncs,
+            'bytes': self.size,
+            'checkpoints': self.checkpoints,
+            'checkpoint_ms': self.checkpoint_ms
+        }
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        with self._io:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
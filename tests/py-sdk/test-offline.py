@@ -0,0 +1,822 @@
+#!/usr/bin/env python3
+"""
+Python SDK tests that run without a real OpenMemory backend.
+"""
+
+import sys
+import os
+import json
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the SDK to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'sdk-py'))
+
+from openmemory import (
+    OpenMemory, Embedder, EmbeddingCache, LocalMemory, MicroBatcher, ShardedMemory, TenantMemory,
+    VectorStore, WaypointGraph, classify_content
+)
+from openmemory import parallel
+from openmemory.dedup import simhash
+from openmemory.parallel import map_add, map_query
+
+test_results = {'passed': 0, 'failed': 0, 'total': 0, 'failures': []}
+
+# Simple assertion functions
+def assert_test(condition, message):
+    test_results['total'] += 1
+    if condition:
+        test_results['passed'] += 1
+        print(f'✅ {message}')
+    else:
+        test_results['failed'] += 1
+        test_results['failures'].append(message)
+        print(f'❌ {message}')
+
+def assert_equal(actual, expected, message):
+    assert_test(actual == expected, message or f'Expected {expected}, got {actual}')
+
+# Fake backend replicas
+def start_fake_backend(name):
+    """Start a tiny HTTP server that answers like a backend replica."""
+    hits = {'GET': 0, 'POST': 0, 'bodies': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('content-type', 'application/json')
+            self.send_header('content-length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            hits['GET'] += 1
+            self._reply({'ok': True, 'name': name})
+
+        def do_POST(self):
+            hits['POST'] += 1
+            length = int(self.headers.get('content-length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            hits['bodies'].append(body)
+            if self.path == '/memory/add':
+                self._reply({'id': name + '-id', 'primary_sector': 'semantic', 'sectors': ['semantic']})
+            else:
+                sector = (body.get('filters') or {}).get('sector', 'semantic')
+                match = {'id': sector, 'score': len(sector) / 10, 'primary_sector': sector}
+                self._reply({'query': body.get('query'), 'matches': [match], 'name': name})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+# Test functions
+def test_multi_endpoint_client():
+    """Test read balancing, primary writes and ejection across replicas"""
+    print('\n⚖️ Testing Multi-Endpoint Client...')
+
+    (s1, h1), (s2, h2) = start_fake_backend('a'), start_fake_backend('b')
+    urls = [f'http://127.0.0.1:{s.server_address[1]}' for s in (s1, s2)]
+    client = OpenMemory(base_url=urls, policy='ewma', health_interval=0)
+    try:
+        for _ in range(6):
+            client.add('write me')
+        assert_equal(h1['POST'], 6, 'Writes should all go to the primary')
+        assert_equal(h2['POST'], 0, 'Writes should never reach a replica')
+
+        for _ in range(10):
+            client.query('read me')
+        assert_test(h2['POST'] > 0, 'Reads should be spread onto the replica')
+
+        s2.shutdown()
+        s2.server_close()
+        for _ in range(5):
+            res = client.query('read me')
+        assert_equal(res['name'], 'a', 'Reads should fail over to a live replica')
+        health = client.lb.check_health(timeout=1)
+        assert_equal(health[urls[1]], False, 'Health probe should flag the dead replica')
+        assert_test(client.endpoints()[1]['ejected'], 'Dead replica should be ejected')
+    finally:
+        client.close()
+        s1.shutdown()
+
+def test_parallel_helpers():
+    """Test ordered/unordered streaming, rate limiting and checkpoint resume"""
+    print('\n🧵 Testing Parallel Helpers...')
+
+    server, hits = start_fake_backend('a')
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        results = list(map_add([f'memory {i}' for i in range(50)], workers=4, base_url=url))
+        assert_equal([r['index'] for r in results], list(range(50)), 'Ordered results should keep input order')
+        assert_test(all(r['ok'] for r in results), 'Every add should succeed')
+
+        results = list(map_query(['q'] * 20, workers=4, ordered=False, rate=1000, base_url=url))
+        assert_equal(sorted(r['index'] for r in results), list(range(20)), 'Unordered results should cover every item')
+
+        ckpt = os.path.join(tempfile.mkdtemp(), 'backfill.ckpt')
+        stream = map_add(['x'] * 30, workers=2, checkpoint=ckpt, base_url=url)
+        first = [next(stream) for _ in range(10)]
+        stream.close()
+        before = hits['POST']
+        rest = list(map_add(['x'] * 30, workers=2, checkpoint=ckpt, base_url=url))
+        assert_test(all(r['index'] >= 10 for r in rest), 'Resumed run should skip checkpointed items')
+        assert_test(hits['POST'] - before <= 20, 'Resumed run should not redo finished work')
+        assert_equal(len(first), 10, 'Stream should yield results incrementally')
+
+        opened, closed = [], []
+        make_client, close = parallel._make_client, OpenMemory.close
+        parallel._make_client = lambda options: opened.append(make_client(options)) or opened[-1]
+        OpenMemory.close = lambda self: closed.append(self) or close(self)
+        try:
+            before = hits['POST']
+            results = list(map_add(['same text'] * 12, workers=3, dedup=True, base_url=url))
+        finally:
+            parallel._make_client, OpenMemory.close = make_client, close
+        assert_test(opened and all(c in closed for c in opened), 'Every worker client should be closed')
+        assert_equal(hits['POST'] - before, 12, 'map_add should not pre-filter duplicates per worker')
+        assert_test(not any(r['result'].get('deduplicated') for r in results), 'No add should be deduplicated client-side')
+    finally:
+        server.shutdown()
+
+def test_sector_classifier():
+    """Test the local classifyContent port and client-side sector routing"""
+    print('\n🧭 Testing Sector Classifier...')
+
+    c = classify_content('I went to Paris yesterday and loved the Eiffel Tower')
+    assert_equal(c['primary'], 'episodic', 'Travel memory should be episodic')
+    assert_equal(c['additional'], [], '"loved" should not match the \\blove\\b pattern')
+    c = classify_content('I felt great')
+    assert_equal(c['primary'], 'episodic', 'Overlapping patterns should both fire')
+    assert_equal(c['additional'], ['emotional'], '"felt" inside "I felt" should still count')
+    c = classify_content('plain words only')
+    assert_equal((c['primary'], c['confidence']), ('semantic', 0.2), 'No match should default to semantic')
+    c = classify_content('anything', {'sector': 'reflective'})
+    assert_equal(c['primary'], 'reflective', 'Metadata sector should override')
+
+    server, hits = start_fake_backend('a')
+    client = OpenMemory(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+    try:
+        client.query('how to install the app', route='primary')
+        assert_equal(hits['bodies'][-1]['filters'], {'sector': 'procedural'}, 'Primary route should pin the predicted sector')
+        try:
+            client.query('I felt happy today', route='fanout')
+            assert_test(False, 'Fan-out routing should not be offered')
+        except ValueError:
+            assert_test(True, 'Fan-out routing should not be offered')
+        assert_equal(hits['POST'], 1, 'Rejected routes should send nothing')
+    finally:
+        server.shutdown()
+
+def test_embedding_cache():
+    """Test LRU and persistent tiers of the embedding cache"""
+    print('\n🗃️ Testing Embedding Cache...')
+
+    path = tempfile.mkdtemp()
+    calls = []
+
+    def fake_model(texts, sector):
+        calls.extend(texts)
+        return [[float(len(t)), 1.0, 0.0, 2.0] for t in texts]
+
+    cache = EmbeddingCache(path, max_items=2)
+    embedder = Embedder('fake', dim=4, fn=fake_model, cache=cache)
+    for text in ['hello', 'hello', 'world', 'again', 'hello']:
+        embedder.embed(text, 'semantic')
+    embedder.embed('hello', 'episodic')
+    assert_equal(calls, ['hello', 'world', 'again', 'hello'], 'Only unseen (text, sector) pairs should be embedded')
+    stats = cache.stats()
+    assert_equal((stats['hits_memory'], stats['hits_disk']), (1, 1), 'Evicted entries should be served from disk')
+    cache.close()
+
+    reopened = EmbeddingCache(path)
+    vec = Embedder('fake', dim=4, fn=fake_model, cache=reopened).embed('world', 'semantic')
+    assert_equal(list(vec), [5.0, 1.0, 0.0, 2.0], 'Cache should survive reopening')
+    assert_equal(len(calls), 4, 'Reopened cache should not re-embed')
+    assert_equal(reopened.stats()['hit_rate'], 1.0, 'Hit rate should be reported')
+    reopened.close()
+
+def test_micro_batcher():
+    """Test that concurrent embed requests share batched model calls"""
+    print('\n📦 Testing Micro-Batcher...')
+
+    calls = []
+
+    def fake_model(texts, sector):
+        calls.append((sector, len(texts)))
+        return [[float(len(t)), 0.0] for t in texts]
+
+    batcher = MicroBatcher(Embedder('fake', dim=2, fn=fake_model), max_batch=8, max_wait_ms=20)
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.embed_multi_sector('x' * i, ['semantic', 'emotional'])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(1, 17)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert_equal(len(results), 16, 'Every caller should get a result')
+    assert_test(all(r[0]['vector'][0] == float(i) for i, r in results.items()), 'Results should be scattered back to the right caller')
+    assert_test(len(calls) < 32, f'Requests should be coalesced ({len(calls)} model calls for 32 embeds)')
+    assert_test(all(n <= 8 for _, n in calls), 'Batches should respect max_batch')
+
+def test_waypoint_graph():
+    """Test CSR graph expansion, reinforcement, pruning and persistence"""
+    print('\n🔗 Testing Waypoint Graph...')
+
+    path = tempfile.mkdtemp()
+    graph = WaypointGraph(path, merge_threshold=2)
+    graph.add_edges([('a', 'b', 1.0), ('a', 'c', 0.5), ('b', 'd', 0.5), ('c', 'e', 0.04)])
+    assert_equal([n for n, _ in graph.neighbors('a')], ['b', 'c'], 'A node should keep several outgoing edges')
+
+    expanded = {e['id']: e for e in graph.expand(['a'])}
+    assert_equal(round(expanded['b']['weight'], 6), 0.8, 'One hop should decay by 0.8')
+    assert_equal(expanded['d']['path'], ['a', 'b', 'd'], 'Two hops should keep the path')
+    assert_test('e' not in expanded, 'Paths below 0.1 should be dropped')
+
+    graph.reinforce([['a', 'c'], ['a', 'c', 'e']])
+    assert_equal(round(graph.weight('a', 'c'), 6), 0.6, 'Repeated edges should get one boost per traversal')
+    assert_equal(graph.prune(), 0, 'Reinforced weak edge should survive pruning')
+    graph.add_edge('d', 'z', 0.01)
+    assert_equal(graph.prune(), 1, 'Weak edges should be pruned')
+    graph.checkpoint()
+    graph.remove_node('b')
+    graph.add_edge('x', 'a', 0.7)
+    graph.close()
+
+    reopened = WaypointGraph(path)
+    assert_equal(reopened.neighbors('a'), [('c', reopened.weight('a', 'c'))], 'Removed node should stay removed after reopen')
+    assert_equal(round(reopened.weight('x', 'a'), 6), 0.7, 'Logged edges should be replayed on open')
+    assert_equal(reopened.weight('d', 'z'), None, 'Pruned edges should stay pruned')
+    reopened.close()
+
+def test_quantized_store():
+    """Test int8/PQ candidate scoring with exact re-ranking from the mmap store"""
+    print('\n🗜️  Testing Quantized Vector Store...')
+
+    rng = random.Random(3)
+    centers = [[rng.gauss(0, 1) for _ in range(32)] for _ in range(60)]
+    vectors = [[x + rng.gauss(0, 0.3) for x in rng.choice(centers)] for _ in range(300)]
+    query = [x + rng.gauss(0, 0.1) for x in vectors[42]]
+    exact = VectorStore(None, 'semantic', 32)
+    for i, vec in enumerate(vectors):
+        exact.add(f'm{i}', vec)
+    truth = exact.search(query, 5)
+    assert_equal(truth[0][0], 'm42', 'Exact search should find the nearest vector')
+
+    for quantization in ('int8', 'pq'):
+        path = tempfile.mkdtemp()
+        store = VectorStore(path, 'semantic', 32, quantization, rerank=4, train_size=200)
+        for i, vec in enumerate(vectors):
+            store.add(f'm{i}', vec)
+        stats = store.stats()
+        assert_test(stats['trained'] and stats['code_bytes'] < stats['vector_bytes'] / 3,
+                    f'{quantization} codes should be much smaller than float32 rows')
+        if quantization == 'pq':
+            assert_equal(stats['code_bytes'], 300 * 4, 'PQ should store one byte per subspace')
+        found = store.search(query, 5)
+        assert_equal([i for i, _ in found], [i for i, _ in truth], f'{quantization} re-ranking should match exact top-k')
+        assert_equal(round(found[0][1], 5), round(truth[0][1], 5), f'{quantization} scores should be exact cosine')
+        store.delete('m42')
+        store.close()
+
+        reopened = VectorStore(path, 'semantic', 32, quantization, rerank=4, train_size=200)
+        assert_equal(reopened.stats()['code_bytes'], stats['code_bytes'], f'{quantization} codes should be reloaded')
+        assert_test('m42' not in [i for i, _ in reopened.search(query, 5)], 'Deleted rows should stay deleted')
+        reopened.close()
+
+    ids_file = os.path.join(path, 'semantic.ids')
+    before = os.stat(ids_file).st_mtime_ns
+    time.sleep(0.01)
+    VectorStore(path, 'semantic', 32).close()
+    assert_equal(os.stat(ids_file).st_mtime_ns, before, 'A clean open should not rewrite the ids file')
+    size = os.path.getsize(ids_file)
+    for ext, tail in (('ids', b'torn-id'), ('dead', b'7')):
+        with open(os.path.join(path, f'semantic.{ext}'), 'ab') as f:
+            f.write(tail)
+    store = VectorStore(path, 'semantic', 32)
+    store.add('m300', vectors[0])
+    store.delete('m300')
+    store.close()
+    store = VectorStore(path, 'semantic', 32)
+    assert_equal(len(store.ids), 301, 'A torn id line should be cut without losing rows')
+    assert_test('m300' not in store and 'm41' in store and 'm42' not in store,
+                'Lines appended after a torn tail should parse')
+    assert_test(os.path.getsize(ids_file) > size, 'The ids file should only be cut back to its last full line')
+    store.close()
+
+def test_local_engine():
+    """Test the embedded engine against the server's add/query/delete flow"""
+    print('\n🏠 Testing Local Engine...')
+
+    path = tempfile.mkdtemp()
+    mem = LocalMemory(path, dim=64, quantization='int8')
+    added = mem.add('Yesterday I went to the beach and felt happy', tags=['trip'])
+    expected = classify_content('Yesterday I went to the beach and felt happy')
+    assert_equal(added['sectors'], [expected['primary']] + expected['additional'], 'Add should classify like the server')
+    assert_equal(mem.stats()['emotional']['live'], 1, 'Each sector should get its own vector')
+    other = mem.add('How to install the package: first run pip, then configure it')
+    result = mem.query('what happened yesterday at the beach', k=1)
+    assert_equal(result['matches'][0]['id'], added['id'], 'Query should return the matching memory')
+    # Salience keeps decaying between the two reads
+    assert_test(abs(mem.get(added['id'])['salience'] - min(1.0, result['matches'][0]['salience'] + 0.1)) < 1e-6,
+                'Returned memories should be reinforced')
+    mem.delete(other['id'])
+    mem.close()
+
+    reopened = LocalMemory(path, dim=64, quantization='int8')
+    items = reopened.all()['items']
+    assert_equal([i['id'] for i in items], [added['id']], 'Memories should persist and deletes should stick')
+    assert_equal(items[0]['tags'], ['trip'], 'Tags should round-trip')
+    reopened.close()
+
+def test_hybrid_query():
+    """Test BM25 identifier matching fused with vector scores"""
+    print('\n🔎 Testing Hybrid Query...')
+
+    mem = LocalMemory(None, dim=64, embedder=Embedder('local', 64))
+    ids = {}
+    for code in ('E1041', 'E1042', 'E1043', 'SKU-88-B'):
+        ids[code] = mem.add(f'Yesterday the sync job failed with {code} during backup')['id']
+    mem.add('Yesterday I went to the beach')
+
+    hybrid = mem.query('what happened yesterday with E1042?', k=1, mode='hybrid')
+    assert_equal(hybrid['matches'][0]['id'], ids['E1042'], 'Hybrid mode should match the exact identifier')
+    joined = mem.query('sku-88-b', k=1, mode='hybrid', fusion='rrf')
+    assert_equal(joined['matches'][0]['id'], ids['SKU-88-B'], 'Joined identifiers should be indexed whole')
+
+    mem.delete(ids['E1042'])
+    after = mem.query('E1042', k=3, mode='hybrid')
+    assert_test(ids['E1042'] not in [m['id'] for m in after['matches']], 'Deleted memories should leave the index')
+    try:
+        mem.query('x', mode='keyword')
+        assert_test(False, 'Unknown modes should be rejected')
+    except ValueError:
+        assert_test(True, 'Unknown modes should be rejected')
+
+def test_filtered_query():
+    """Test tag/metadata bitmap filters applied before vector scoring"""
+    print('\n🏷️  Testing Filtered Query...')
+
+    path = tempfile.mkdtemp()
+    mem = LocalMemory(path, dim=64, embedder=Embedder('local', 64))
+    ids = []
+    for i in range(30):
+        tags = ['vip'] if i % 10 == 0 else ['regular']
+        ids.append(mem.add(f'Yesterday I met friend {i} at the cafe', tags=tags,
+                           metadata={'user': f'u{i % 3}', 'topics': ['coffee', f't{i}']})['id'])
+
+    vip = mem.query('what happened yesterday at the cafe', k=10, filters={'tags': ['vip']})
+    assert_equal(sorted(m['id'] for m in vip['matches']), sorted(ids[::10]), 'Tag filter should keep only tagged memories')
+    both = mem.query('yesterday at the cafe', k=10, filters={'tags': ['vip'], 'metadata': {'user': 'u1'}})
+    assert_equal([m['id'] for m in both['matches']], [ids[10]], 'Tag and metadata filters should intersect')
+    any_of = mem.query('yesterday at the cafe', k=10, filters={'metadata': {'topics': ['t4', 't5']}})
+    assert_equal(sorted(m['id'] for m in any_of['matches']), sorted(ids[4:6]), 'List values should match any element')
+    none = mem.query('yesterday at the cafe', k=10, filters={'tags': ['missing']})
+    assert_equal(none['matches'], [], 'Filters without survivors should return nothing')
+    mem.delete(ids[0])
+    mem.close()
+
+    reopened = LocalMemory(path, dim=64, embedder=Embedder('local', 64))
+    vip = reopened.query('yesterday at the cafe', k=10, filters={'tags': ['vip']})
+    assert_equal(sorted(m['id'] for m in vip['matches']), sorted(ids[10::10]), 'Filter indexes should be rebuilt on open')
+    reopened.close()
+
+def test_time_range_query():
+    """Test since/until windows and recent() over the time-ordered rows"""
+    print('\n🕒 Testing Time-Range Query...')
+
+    path = tempfile.mkdtemp()
+    mem = LocalMemory(path, dim=64, embedder=Embedder('local', 64))
+    old = [mem.add(f'Yesterday I went to meeting {i}')['id'] for i in range(3)]
+    time.sleep(0.01)
+    cutoff = int(time.time() * 1000)
+    time.sleep(0.01)
+    new = [mem.add(f'Yesterday I went to lunch {i}')['id'] for i in range(3)]
+    mem.add('Define the concept of entropy')
+
+    since = mem.query('what did I do yesterday', k=10, since=cutoff)
+    assert_equal(sorted(m['id'] for m in since['matches']), sorted(new), 'since should drop older memories')
+    until = mem.query('what did I do yesterday', k=10, until=cutoff)
+    assert_equal(sorted(m['id'] for m in until['matches']), sorted(old), 'until should drop newer memories')
+    assert_equal([i['id'] for i in mem.recent(2, 'episodic')['items']], new[::-1][:2], 'recent should list newest first')
+    assert_equal(mem.recent(1)['items'][0]['content'], 'Define the concept of entropy', 'recent without a sector should span all sectors')
+    mem.delete(new[2])
+    mem.close()
+
+    reopened = LocalMemory(path, dim=64, embedder=Embedder('local', 64))
+    assert_equal([i['id'] for i in reopened.recent(2, 'episodic')['items']], [new[1], new[0]], 'Time index should be rebuilt on open')
+    since = reopened.query('what did I do yesterday', k=10, since=cutoff)
+    assert_equal(sorted(m['id'] for m in since['matches']), sorted(new[:2]), 'Windows should survive reopen and deletes')
+    reopened.close()
+
+def test_lazy_decay():
+    """Test read-time decay and the bounded incremental compactor"""
+    print('\n⏳ Testing Lazy Decay...')
+
+    path = tempfile.mkdtemp()
+    mem = LocalMemory(path, dim=64, embedder=Embedder('local', 64), decay_interval=None, decay_batch=4)
+    ids = [mem.add(f'Yesterday I went to the market {i}')['id'] for i in range(10)]
+    initial = mem.get(ids[0])['salience']
+    ten_days = 10 * 24 * 60 * 60 * 1000
+    mem.db.execute('update memories set decay_ts = decay_ts - ?', (ten_days,))
+    mem.db.commit()
+
+    before = mem.get(ids[0])['salience']
+    assert_test(0.5 * initial < before < 0.95 * initial, 'Reads should decay salience lazily')
+    mem.decay.min_age_ms = 0
+    step = mem.run_decay(budget_ms=0)
+    assert_equal(step['processed'], 4, 'A run should stop after its budget, batch by batch')
+    while mem.decay.passes == 0:
+        mem.run_decay()
+    stored = mem.db.execute('select salience from memories where id=?', (ids[0],)).fetchone()[0]
+    assert_test(abs(stored - before) < 1e-3, 'Compaction should persist the decayed salience')
+    assert_test(abs(mem.get(ids[0])['salience'] - before) < 1e-3, 'Reads should agree before and after compaction')
+    assert_equal(mem.decay.stats()['processed'], 10, 'A pass should visit every row once')
+    mem.run_decay()
+    assert_test(abs(mem.get(ids[0])['salience'] - before) < 1e-3, 'Compaction should not decay twice')
+    mem.reinforce(ids[1])
+    assert_test(abs(mem.get(ids[1])['salience'] - (before + 0.1)) < 1e-3, 'Reinforcement should boost the decayed value')
+    mem.close()
+
+def test_write_ahead_log():
+    """Test WAL group commit, crash replay and checkpoints"""
+    print('\n📜 Testing Write-Ahead Log...')
+
+    path = tempfile.mkdtemp()
+    mem = LocalMemory(path, dim=64, embedder=Embedder('local', 64), decay_interval=None, durability='batch')
+    kept = mem.add('Yesterday I went to the beach', tags=['trip'])['id']
+    gone = mem.add('Yesterday I went to the dentist')['id']
+    mem.reinforce(kept, 0.3)
+    mem.delete(gone)
+    salience = mem.get(kept)['salience']
+
+    threads = [threading.Thread(target=lambda i=i: [mem.add(f'Yesterday I met friend {i} {j}') for j in range(5)])
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wal = mem.stats()['wal']
+    assert_equal(wal['records'], 44, 'Every write should be logged')
+    assert_test(wal['syncs'] <= wal['records'], 'Concurrent writers should share fsyncs')
+
+    # Crash: uncommitted SQLite changes are rolled back, the log survives
+    mem.decay.close()
+    mem.wal.stop()
+    mem.db.close()
+    with open(os.path.join(path, 'wal.log'), 'ab') as f:
+        f.write(b'0badc0de {"op": "add", "id": "torn')
+
+    reopened = LocalMemory(path, dim=64, embedder=Embedder('local', 64), decay_interval=None, durability='batch')
+    assert_equal(os.path.getsize(os.path.join(path, 'wal.log')), 0, 'Replay should end with a checkpoint')
+    assert_test(reopened.get(kept) is not None and reopened.get(gone) is None, 'Replay should redo adds and deletes')
+    assert_test(abs(reopened.get(kept)['salience'] - salience) < 1e-3, 'Replay should redo reinforcement')
+    assert_equal(len(reopened.all(limit=100)['items']), 41, 'Replay should restore concurrent adds')
+    assert_equal(reopened.query('what happened yesterday at the beach', k=1, filters={'tags': ['trip']})['matches'][0]['id'], kept,
+                 'Indexes should be rebuilt from replayed rows')
+    reopened.graph.add_edge(kept, 'other', 0.5)
+    reopened.graph.reinforce([[kept, 'other']])
+    reopened.checkpoint()
+    assert_equal(os.path.getsize(os.path.join(path, 'graph', 'edges.log')), 0, 'Checkpoints should truncate the graph log')
+    reopened.close()
+    reopened = LocalMemory(path, dim=64, embedder=Embedder('local', 64), decay_interval=None, durability='batch')
+    assert_test(abs(reopened.graph.weight(kept, 'other') - 0.55) < 1e-6, 'The graph snapshot should keep the edges')
+    reopened.close()
+
+    # Crash after a write reached the vector files but before its log record
+    # was synced: the files are cut back to the last checkpoint
+    child = """
+import os, sys
+sys.path.insert(0, sys.argv[2])
+from openmemory import Embedder, LocalMemory
+mem = LocalMemory(sys.argv[1], dim=64, embedder=Embedder('local', 64), decay_interval=None, durability='batch')
+kept = mem.add('Yesterday I went to the beach')['id']
+mem.checkpoint()
+def crash(seq):
+    for store in mem._vector_stores().values():
+        store.flush()
+    os._exit(1)
+mem.wal.sync = crash
+if sys.argv[3] == 'add':
+    mem.add('Yesterday I went to the dentist')
+else:
+    mem.delete(kept)
+"""
+    sdk = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'sdk-py')
+    for op in ('add', 'delete'):
+        path = tempfile.mkdtemp()
+        subprocess.run([sys.executable, '-c', child, path, sdk, op])
+        reopened = LocalMemory(path, dim=64, embedder=Embedder('local', 64), decay_interval=None, durability='batch')
+        items = reopened.all()['items']
+        assert_equal([len(st.ids) for st in reopened._vector_stores().values() if st.ids],
+                     [1] * len(reopened._sectors_of(items[0]['id']) + ['mean']),
+                     f'An unlogged {op} should leave no orphan rows or tombstones')
+        found = reopened.query('what happened yesterday at the beach', k=1, reinforce=False)['matches']
+        assert_equal([m['id'] for m in found], [items[0]['id']], f'The checkpointed memory should survive an unlogged {op}')
+        reopened.close()
+
+    # A logged directory reopened without durability still recovers the log,
+    # and a later WAL run does not cut the files back to stale sizes
+    path = tempfile.mkdtemp()
+    options = {'dim': 64, 'embedder': Embedder('local', 64), 'decay_interval': None}
+    mem = LocalMemory(path, durability='batch', **options)
+    logged = mem.add('Yesterday I went to the beach')['id']
+    mem.wal.stop()
+    mem.db.close()
+    mem = LocalMemory(path, **options)
+    assert_test(mem.get(logged) is not None, 'Opening without durability should replay a leftover log')
+    assert_equal(os.path.getsize(os.path.join(path, 'wal.log')), 0, 'The leftover log should be checkpointed')
+    plain = mem.add('Yesterday I went to the museum')['id']
+    mem.close()
+    mem = LocalMemory(path, durability='batch', **options)
+    found = mem.query('what happened yesterday at the museum', k=1, reinforce=False)['matches']
+    assert_equal([m['id'] for m in found], [plain], 'Writes made without a WAL should survive reopening with one')
+    mem.close()
+
+def test_near_duplicates():
+    """Test SimHash dedup on the local engine and as a client pre-filter"""
+    print('\n🪞 Testing Near-Duplicate Detection...')
+
+    mem = LocalMemory(None, dim=64, embedder=Embedder('local', 64), decay_interval=None, dedup=True)
+    first = mem.add('The nightly build failed with exit code 1 at the compile step')
+    salience = mem.get(first['id'])['salience']
+    again = mem.add('the nightly build failed with exit code 1 at the compile step!')
+    assert_equal(again['id'], first['id'], 'Near-duplicates should map to the stored memory')
+    assert_test(again.get('deduplicated'), 'Near-duplicates should be flagged')
+    assert_test(mem.get(first['id'])['salience'] > salience, 'Near-duplicates should reinforce the stored memory')
+    edited = 'The nightly build failed with exit code 1 at the link step'
+    assert_test('deduplicated' not in mem.add(edited), 'The default distance should keep one-word edits of short texts')
+    loose = LocalMemory(None, dim=64, embedder=Embedder('local', 64), decay_interval=None, dedup=True, dedup_distance=12)
+    loose.add('The nightly build failed with exit code 1 at the compile step')
+    assert_test(loose.add(edited).get('deduplicated'), 'A larger distance should merge one-word edits')
+    other = mem.add('Yesterday I went hiking in the mountains with my sister')
+    assert_test(other['id'] != first['id'] and 'deduplicated' not in other, 'Different content should be inserted')
+
+    results = mem.add_many(['Hello! How can I help you today?', 'Hello, how can I help you today?',
+                            {'content': 'hello how can I help you today', 'tags': ['greeting']}])
+    assert_equal(len({r['id'] for r in results}), 1, 'Duplicates within a batch should collapse')
+    dedup = mem.stats()['dedup']
+    assert_equal((dedup['checked'], dedup['duplicates']), (7, 3), 'Dedup counters should be reported')
+    mem.delete(first['id'])
+    assert_test('deduplicated' not in mem.add('The nightly build failed with exit code 1 at the compile step'),
+                'Deleted memories should leave the dedup index')
+    emoji = mem.add('😀😀')
+    assert_test('deduplicated' not in mem.add('!!! ???') and 'deduplicated' not in emoji,
+                'Texts without words should never be duplicates')
+
+    embed = mem.embedder.embed_multi_sector
+    def racing(content, *args):
+        # A second add of the same text lands while the first is embedding
+        mem.embedder.embed_multi_sector = embed
+        mem.add(content)
+        return embed(content, *args)
+    mem.embedder.embed_multi_sector = racing
+    assert_test(mem.add('Racing writers both add this exact sentence').get('deduplicated'),
+                'The in-lock recheck should catch concurrent duplicates')
+    assert_equal(mem.stats()['dedup']['races'], 1, 'Dedup stats should count races')
+
+    try:
+        mem.add('The deploy to staging finished without errors', metadata={'bad': {1, 2}})
+        assert_test(False, 'Unserializable metadata should fail the add')
+    except TypeError:
+        assert_test(True, 'Unserializable metadata should fail the add')
+    res = mem.add('The deploy to staging finished without errors.')
+    assert_test('deduplicated' not in res and mem.get(res['id']), 'A failed add should not stay in the dedup index')
+    mem.dedup.add('ghost', simhash('Backups rotate every Sunday night'))
+    res = mem.add('Backups rotate every Sunday night')
+    assert_test('deduplicated' not in res and 'ghost' not in mem.dedup.fingerprints,
+                'A stale dedup id should be dropped and the memory inserted')
+
+    server, hits = start_fake_backend('a')
+    client = OpenMemory(base_url=f'http://127.0.0.1:{server.server_address[1]}', dedup=True)
+    try:
+        client.add('Tool output: 42 files scanned, 0 errors')
+        res = client.add('Tool output: 42 files scanned, 0 errors.')
+        assert_test(res['deduplicated'], 'The client pre-filter should catch near-duplicates')
+        assert_equal([b.get('boost') for b in hits['bodies']], [None, 0.1], 'The client should reinforce instead of adding')
+        assert_equal(client.dedup_stats.stats()['ratio'], 0.5, 'The client should report its dedup ratio')
+    finally:
+        server.shutdown()
+
+def test_sharded_engine():
+    """Test id-hash sharding with scatter/gather queries across processes"""
+    print('\n🧩 Testing Sharded Engine...')
+
+    path = tempfile.mkdtemp()
+    options = {'dim': 64, 'embedder': Embedder('local', 64), 'decay_interval': None}
+    single = LocalMemory(None, **options)
+    mem = ShardedMemory(path, shards=2, **options)
+    try:
+        contents = [f'Yesterday I went to the {place}' for place in
+                    ('beach', 'museum', 'market', 'dentist', 'cinema', 'library', 'stadium', 'harbour')]
+        ids = [r['id'] for r in mem.add_many(contents)]
+        single.add_many(contents)
+        assert_test(all(s['episodic']['live'] for s in mem.stats()), 'Ids should spread over shards')
+        question = 'what happened yesterday at the museum'
+        matches = mem.query(question, k=3)['matches']
+        expected = [m['content'] for m in single.query(question, k=3)['matches']]
+        assert_equal([m['content'] for m in matches], expected, 'Merged top-k should match a single engine')
+        loser = next(i for i in ids if i not in {m['id'] for m in matches})
+        assert_test(mem.get(matches[0]['id'])['salience'] > mem.get(loser)['salience'],
+                    'Only merged winners should be reinforced')
+        mem.delete(ids[2])
+        assert_test(mem.get(ids[2]) is None, 'Deletes should reach the owning shard')
+        try:
+            mem.reinforce('missing')
+            assert_test(False, 'Shard errors should reach the caller')
+        except KeyError:
+            assert_test(True, 'Shard errors should reach the caller')
+        time.sleep(0.01)
+        latest = mem.add('Yesterday I went to the zoo')['id']
+        assert_equal(mem.all(limit=1)['items'][0]['id'], latest, 'all() should merge newest first')
+    finally:
+        mem.close()
+    reopened = ShardedMemory(path, shards=2, dedup=True, **options)
+    try:
+        assert_equal(reopened.sectors()['stats'][0]['count'], 8, 'Shards should reopen from their directories')
+        again = reopened.add_many([c.upper() + '!' for c in contents])
+        kept = [i for n, i in enumerate(ids) if n != 2]
+        assert_equal([r['id'] for n, r in enumerate(again) if n != 2], kept,
+                     'Near-duplicates should be found on whichever shard holds the original')
+        assert_test(all(r.get('deduplicated') for n, r in enumerate(again) if n != 2),
+                    'Sharded near-duplicates should be flagged')
+        assert_equal(reopened.dedup_stats.stats()['duplicates'], 7, 'The parent should count duplicates')
+        try:
+            reopened.add('The deploy to staging finished', metadata={'bad': {1, 2}})
+            assert_test(False, 'A failed shard add should reach the caller')
+        except TypeError:
+            assert_test(True, 'A failed shard add should reach the caller')
+        res = reopened.add('The deploy to staging finished!')
+        assert_test('deduplicated' not in res and reopened.get(res['id']),
+                    'A failed shard add should not stay in the parent dedup index')
+        reopened.dedup.add('ghost', simhash('Backups rotate every Sunday night'))
+        res = reopened.add('Backups rotate every Sunday night')
+        assert_test('deduplicated' not in res and reopened.get(res['id']),
+                    'A stale parent dedup id should fall through to an insert')
+    finally:
+        reopened.close()
+
+def test_tenant_namespaces():
+    """Test per-namespace engines, cache budgets and idle unloading"""
+    print('\n👥 Testing Tenant Namespaces...')
+
+    path = tempfile.mkdtemp()
+    mem = TenantMemory(path, max_open=2, cache_items=8, budgets={'heavy': 2}, dim=64,
+                       embedder=Embedder('local', 64), decay_interval=None)
+    alice = mem.add('Yesterday I went to the beach', user_id='alice')['id']
+    mem.add('Yesterday I went to the beach with my dog', user_id='bob')
+    found = mem.query('what happened yesterday at the beach', k=10, user_id='alice')
+    assert_equal([m['id'] for m in found['matches']], [alice], 'Queries should only see their own namespace')
+    assert_test(mem.get(alice, user_id='bob') is None, 'Ids should not resolve across namespaces')
+
+    mem.query('what happened yesterday at the beach', user_id='alice')
+    for i in range(10):
+        mem.add(f'Heavy tenant note {i}', user_id='heavy')
+    stats = mem.stats()
+    assert_equal(stats['open'], 2, 'Opening a third tenant should unload the least recently used')
+    assert_test(stats['tenants']['heavy']['cache']['memory_items'] <= 2, 'Each tenant should keep to its cache budget')
+    assert_test(stats['unloads'] == 1 and 'bob' not in stats['tenants'], 'The least recently used tenant should go first')
+
+    assert_equal(len(mem.all(user_id='bob')['items']), 1, 'Unloaded tenants should reload lazily')
+    mem.idle_seconds = 0
+    mem.unload_idle()
+    assert_equal(mem.stats()['open'], 0, 'Idle tenants should be unloaded')
+    assert_equal(len(mem.tenants), 0, 'Unloaded tenants should not keep an entry')
+    assert_equal(mem.namespaces(), ['alice', 'bob', 'heavy'], 'Namespaces should be listed from disk')
+    try:
+        mem.add('x', user_id='../escape')
+        assert_test(False, 'Unsafe namespaces should be rejected')
+    except ValueError:
+        assert_test(True, 'Unsafe namespaces should be rejected')
+    mem.close()
+
+    try:
+        OpenMemory(user_id='alice')
+        assert_test(False, 'The remote client should not accept namespaces the server ignores')
+    except TypeError:
+        assert_test(True, 'The remote client should not accept namespaces the server ignores')
+
+def test_compaction():
+    """Test online tombstone compaction of the stores, graph and indexes"""
+    print('\n🧹 Testing Compaction...')
+
+    rng = random.Random(5)
+    vectors = [[rng.gauss(0, 1) for _ in range(32)] for _ in range(300)]
+    query = vectors[8]
+    path = tempfile.mkdtemp()
+    store = VectorStore(path, 'semantic', 32, 'pq', rerank=4, train_size=200)
+    for i, vec in enumerate(vectors):
+        store.add(f'm{i}', vec)
+    for i in range(0, 300, 2):
+        store.delete(f'm{i + 1}')
+    before = store.search(query, 1)
+    size = os.path.getsize(os.path.join(path, 'semantic.f32'))
+
+    def write_during_copy(done, total):
+        # Runs while the copy holds no lock, as a concurrent writer would
+        if 'late' not in store:
+            store.add('late', vectors[3])
+            store.delete('m10')
+    res = store.compact(progress=write_during_copy, retrain=True)
+    assert_equal((res['rows_before'], res['rows_after']), (301, 151), 'Compaction should drop the dead rows')
+    assert_test(res['retrained'] and res['reclaimed_bytes'] > 0, 'Compaction should retrain PQ and reclaim space')
+    assert_test(os.path.getsize(os.path.join(path, 'semantic.f32')) < size, 'The vector file should shrink')
+    assert_test('late' in store and 'm10' not in store, 'Writes during the copy should be caught up')
+    after = store.search(query, 1)
+    assert_equal((after[0][0], round(after[0][1], 5)), (before[0][0], round(before[0][1], 5)),
+                 'Search results should survive compaction')
+    store.close()
+    reopened = VectorStore(path, 'semantic', 32, 'pq', rerank=4, train_size=200)
+    assert_equal((len(reopened.ids), len(reopened)), (151, 150), 'The compacted files should reopen')
+    assert_test(not [f for f in os.listdir(path) if f.endswith('.new')], 'No temporary files should be left')
+    reopened.close()
+
+    path = tempfile.mkdtemp()
+    mem = LocalMemory(path, dim=64, quantization='int8', decay_interval=None)
+    ids = [mem.add(f'Yesterday I went to the beach with friend number {i}', tags=[f't{i % 2}'])['id']
+           for i in range(40)]
+    for mid in ids[:30]:
+        mem.delete(mid)
+    q = 'what happened yesterday at the beach'
+    before = [m['id'] for m in mem.query(q, k=5, reinforce=False)['matches']]
+    job = mem.compact(background=True)
+    during = mem.query(q, k=5, reinforce=False)
+    final = job.wait()
+    assert_equal(final['state'], 'done', 'The background job should finish')
+    assert_test(final['reclaimed_bytes'] > 0 and final['stores'], 'Progress should report reclaimed bytes per store')
+    assert_equal(mem.stats()['compaction']['state'], 'done', 'Engine stats should include the compaction')
+    assert_equal(len(during['matches']), len(before), 'Queries should keep working during compaction')
+    assert_equal([m['id'] for m in mem.query(q, k=5, reinforce=False)['matches']], before,
+                 'Query results should be unchanged after compaction')
+    assert_equal(len(mem.query(q, k=20, filters={'tags': ['t1']}, reinforce=False)['matches']), 5,
+                 'Tag filters should be renumbered')
+    assert_equal([i['id'] for i in mem.recent(3)['items']], ids[:-4:-1], 'Time order should be kept')
+    mem.close()
+    reopened = LocalMemory(path, dim=64, quantization='int8', decay_interval=None)
+    assert_equal([m['id'] for m in reopened.query(q, k=5, reinforce=False)['matches']], before,
+                 'Compacted engines should reopen')
+    reopened.close()
+
+    graph = WaypointGraph()
+    graph.add_edges([('a', 'b', 0.5), ('b', 'c', 0.6), ('c', 'd', 0.7)])
+    graph.remove_node('b')
+    assert_equal((graph.compact(), graph.names), (2, ['c', 'd']), 'Graph nodes of deleted memories should be dropped')
+    assert_equal(graph.neighbors('c'), [('d', graph.weight('c', 'd'))], 'Renumbered edges should be kept')
+
+def run_offline_tests():
+    """Main test runner"""
+    print('🧪 OpenMemory Python SDK Offline Tests')
+    print('======================================')
+
+    try:
+        test_multi_endpoint_client()
+        test_parallel_helpers()
+        test_sector_classifier()
+        test_embedding_cache()
+        test_micro_batcher()
+        test_waypoint_graph()
+        test_quantized_store()
+        test_local_engine()
+        test_hybrid_query()
+        test_filtered_query()
+        test_time_range_query()
+        test_lazy_decay()
+        test_write_ahead_log()
+        test_near_duplicates()
+        test_sharded_engine()
+        test_tenant_namespaces()
+        test_compaction()
+    except Exception as e:
+        print(f'❌ Test execution failed: {e}')
+        test_results['failed'] += 1
+
+    # Print results
+    print('\n📊 Test Results')
+    print('===============')
+    print(f'✅ Passed: {test_results["passed"]}')
+    print(f'❌ Failed: {test_results["failed"]}')
+    print(f'📝 Total:  {test_results["total"]}')
+
+    if test_results['failures']:
+        print('\n💥 Failures:')
+        for failure in test_results['failures']:
+            print(f'   - {failure}')
+
+    success = test_results['failed'] == 0
+    print(f'\n{"🎉 All tests passed!" if success else "💔 Some tests failed"}')
+    return success
+
+if __name__ == '__main__':
+    sys.exit(0 if run_offline_tests() else 1)